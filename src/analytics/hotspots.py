@@ -0,0 +1,402 @@
+"""
+In-memory spatial/temporal aggregation of detection events for city-scale hotspot queries.
+
+Events (device, timestamp, event, probability, vector) are located either by explicit lat/lon or by a
+device -> (lat, lon) registry (hotspot sensors are fixed installations), bucketed into geohash cells
+(integer-encoded, vectorized) and fixed time bins, and accumulated in compact NumPy arrays:
+per (cell, bin) row a count and probability sum per event class plus a movement-vector sum.
+
+Memory stays bounded: only `retention_seconds` of fine time bins are kept; compaction folds older bins
+into per-cell long-term totals (used as the baseline for flow anomalies).
+
+Queries (all vectorized over the active rows):
+- top_k('mugging', k=10, window_seconds=3600)  -> cells with the highest mugging rate in the last hour
+- rolling_rate(cell, 'mugging', window_seconds=3600) -> per-bin rolling rate series for one cell
+- flow_anomalies(window_seconds=3600) -> cells whose recent mean movement vector departs from their baseline
+
+Usage:
+    from src.analytics.hotspots import HotspotIndex
+    index = HotspotIndex(device_locations={'cam-01': (-23.5505, -46.6333)})
+    index.add_batch(timestamps, events, probabilities, vectors=vectors, devices=devices)
+    index.top_k('mugging', k=10, window_seconds=3600)
+"""
+import numpy as np
+
+DEFAULT_EVENTS = ('walk', 'drive', 'mugging')
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(lat, lon, precision=7):
+    """Vectorized geohash as int64 (5 bits per character, longitude bit first)."""
+    lat = np.atleast_1d(np.asarray(lat, dtype='float64'))
+    lon = np.atleast_1d(np.asarray(lon, dtype='float64'))
+    bits = 5 * precision
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lat_q = np.clip(np.floor((lat + 90.0) / 180.0 * (1 << lat_bits)), 0, (1 << lat_bits) - 1).astype(np.int64)
+    lon_q = np.clip(np.floor((lon + 180.0) / 360.0 * (1 << lon_bits)), 0, (1 << lon_bits) - 1).astype(np.int64)
+    code = np.zeros(lat.shape, dtype=np.int64)
+    for i in range(bits):
+        if i % 2 == 0:
+            bit = (lon_q >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_q >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+    return code
+
+
+def geohash_to_str(code, precision=7):
+    code = int(code)
+    return ''.join(GEOHASH_BASE32[(code >> (5 * (precision - 1 - i))) & 31] for i in range(precision))
+
+
+def geohash_from_str(text):
+    code = 0
+    for ch in text:
+        code = (code << 5) | GEOHASH_BASE32.index(ch)
+    return code
+
+
+def geohash_decode(code, precision=7):
+    """Cell centre (lat, lon) of integer geohash(es)."""
+    code = np.atleast_1d(np.asarray(code, dtype=np.int64))
+    bits = 5 * precision
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lat_q = np.zeros(code.shape, dtype=np.int64)
+    lon_q = np.zeros(code.shape, dtype=np.int64)
+    for i in range(bits):
+        bit = (code >> (bits - 1 - i)) & 1
+        if i % 2 == 0:
+            lon_q = (lon_q << 1) | bit
+        else:
+            lat_q = (lat_q << 1) | bit
+    lat = (lat_q + 0.5) / (1 << lat_bits) * 180.0 - 90.0
+    lon = (lon_q + 0.5) / (1 << lon_bits) * 360.0 - 180.0
+    return lat, lon
+
+
+class _Accumulator:
+    """Growable rows of (counts per class, probability sums per class, vector sums) addressed by key."""
+
+    def __init__(self, n_classes, vector_dim, capacity=1024):
+        self.n_classes = n_classes
+        self.vector_dim = vector_dim
+        self.rows = {}
+        self.size = 0
+        self.keys = np.zeros((capacity, 2), dtype=np.int64)  # (cell, bin)
+        self.counts = np.zeros((capacity, n_classes), dtype=np.int32)
+        self.prob_sum = np.zeros((capacity, n_classes), dtype=np.float32)
+        self.vec_sum = np.zeros((capacity, vector_dim), dtype=np.float32)
+
+    def _grow(self, needed):
+        capacity = self.keys.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('keys', 'counts', 'prob_sum', 'vec_sum'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def rows_for(self, cells, bins):
+        """Row index for each unique (cell, bin) pair, creating rows as needed."""
+        out = np.empty(len(cells), dtype=np.int64)
+        new = []
+        for j, key in enumerate(zip(cells.tolist(), bins.tolist())):
+            row = self.rows.get(key)
+            if row is None:
+                row = self.rows[key] = self.size + len(new)
+                new.append(key)
+            out[j] = row
+        if new:
+            self._grow(self.size + len(new))
+            self.keys[self.size:self.size + len(new)] = new
+            self.size += len(new)
+        return out
+
+    def add(self, cells, bins, event_ids, probabilities, vectors):
+        """Accumulate a batch of events (arrays of equal length)."""
+        if len(cells) == 0:
+            return
+        k = self.n_classes
+        # group the batch by (cell, bin) first so the per-key Python work is per unique key, not per event
+        pairs = np.stack([cells, bins], axis=1)
+        uniq, inv = np.unique(pairs, axis=0, return_inverse=True)
+        inv = inv.ravel()
+        rows = self.rows_for(uniq[:, 0], uniq[:, 1])
+        flat = inv * k + event_ids
+        nu = len(uniq)
+        self.counts[rows] += np.bincount(flat, minlength=nu * k).reshape(nu, k).astype(np.int32)
+        self.prob_sum[rows] += np.bincount(flat, weights=probabilities, minlength=nu * k).reshape(nu, k).astype(np.float32)
+        for d in range(self.vector_dim):
+            self.vec_sum[rows, d] += np.bincount(inv, weights=vectors[:, d], minlength=nu).astype(np.float32)
+
+    def view(self):
+        n = self.size
+        return self.keys[:n], self.counts[:n], self.prob_sum[:n], self.vec_sum[:n]
+
+    def keep(self, mask):
+        """Drop rows where mask is False and rebuild the key map."""
+        keys, counts, prob_sum, vec_sum = (a[mask] for a in self.view())
+        n = len(keys)
+        self.keys[:n], self.counts[:n], self.prob_sum[:n], self.vec_sum[:n] = keys, counts, prob_sum, vec_sum
+        self.keys[n:self.size] = 0
+        self.counts[n:self.size] = 0
+        self.prob_sum[n:self.size] = 0
+        self.vec_sum[n:self.size] = 0
+        self.size = n
+        self.rows = {(int(c), int(b)): i for i, (c, b) in enumerate(keys.tolist())}
+        # shrink oversized buffers after large compactions
+        capacity = self.keys.shape[0]
+        if capacity > 1024 and n < capacity // 4:
+            for name in ('keys', 'counts', 'prob_sum', 'vec_sum'):
+                setattr(self, name, getattr(self, name)[:max(1024, capacity // 2)].copy())
+
+    def nbytes(self):
+        return self.keys.nbytes + self.counts.nbytes + self.prob_sum.nbytes + self.vec_sum.nbytes
+
+
+class HotspotIndex:
+    def __init__(self, events=DEFAULT_EVENTS, precision=7, bin_seconds=300, retention_seconds=24 * 3600, vector_dim=2,
+                 device_locations=None, min_probability=0.0, compact_every_seconds=3600, initial_capacity=4096):
+        """
+        precision: geohash length (7 ~ 150 m cells)
+        bin_seconds: width of fine time bins; retention_seconds: how long fine bins are kept before compaction
+        device_locations: dict device -> (lat, lon) for events without explicit coordinates
+        min_probability: events reported with lower probability are ignored
+        """
+        self.events = tuple(events)
+        self._event_ids = {name: i for i, name in enumerate(self.events)}
+        self.precision = precision
+        self.bin_seconds = bin_seconds
+        self.retention_bins = max(1, int(np.ceil(retention_seconds / bin_seconds)))
+        self.compact_every_bins = max(1, int(compact_every_seconds // bin_seconds))
+        self.vector_dim = vector_dim
+        self.min_probability = min_probability
+        self._device_cells = {}
+        for device, (lat, lon) in (device_locations or {}).items():
+            self.register_device(device, lat, lon)
+        self.recent = _Accumulator(len(self.events), vector_dim, initial_capacity)
+        self.archive = _Accumulator(len(self.events), vector_dim, 256)  # keyed by (cell, 0)
+        self.latest_bin = None
+        self._last_compact_bin = None
+        self.ingested = 0
+        self.skipped = 0
+        self._pending = []
+
+    def register_device(self, device, lat, lon):
+        self._device_cells[device] = int(geohash_encode(lat, lon, self.precision)[0])
+
+    def _event_index(self, events):
+        events = np.asarray(events)
+        if events.dtype.kind in 'iu':
+            return events.astype(np.int64)
+        return np.array([self._event_ids.get(e, -1) for e in events.tolist()], dtype=np.int64)
+
+    def add(self, device, timestamp, event, probability, vector=None, lat=None, lon=None):
+        """Queue one event; queued events are flushed on the next batch or query."""
+        self._pending.append((device, timestamp, event, probability, vector, lat, lon))
+        if len(self._pending) >= 4096:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        devices, ts, ev, prob, vec, lat, lon = zip(*pending)
+        vectors = np.array([v if v is not None else np.zeros(self.vector_dim) for v in vec], dtype='float32')
+        lat = np.array([np.nan if a is None else a for a in lat], dtype='float64')
+        lon = np.array([np.nan if a is None else a for a in lon], dtype='float64')
+        self.add_batch(ts, ev, prob, vectors=vectors, devices=devices, lat=lat, lon=lon)
+
+    def _locate(self, n, devices=None, lat=None, lon=None):
+        """Cell per row: geohash where lat/lon are finite, device registry otherwise (-1 if neither)."""
+        cells = np.full(n, -1, dtype=np.int64)
+        has_coords = np.zeros(n, dtype=bool)
+        if lat is not None and lon is not None:
+            lat = np.asarray(lat, dtype='float64').reshape(n)
+            lon = np.asarray(lon, dtype='float64').reshape(n)
+            has_coords = np.isfinite(lat) & np.isfinite(lon)
+            if has_coords.any():
+                cells[has_coords] = geohash_encode(lat[has_coords], lon[has_coords], self.precision)
+        if devices is not None and not has_coords.all():
+            missing = np.flatnonzero(~has_coords)
+            cells[missing] = [self._device_cells.get(devices[i], -1) for i in missing]
+        return cells
+
+    def add_batch(self, timestamps, events, probabilities, vectors=None, devices=None, lat=None, lon=None):
+        """
+        Vectorized ingest. timestamps in epoch seconds; events as names or class ids. Each row is located by
+        its lat/lon when finite (NaN marks a missing coordinate), else by its device's registered location.
+        """
+        if self._pending:
+            self.flush()
+        ts = np.asarray(timestamps, dtype='float64')
+        n = len(ts)
+        if n == 0:
+            return
+        event_ids = self._event_index(events)
+        prob = np.asarray(probabilities, dtype='float64')
+        vectors = np.zeros((n, self.vector_dim), dtype='float32') if vectors is None else np.asarray(vectors, dtype='float32').reshape(n, self.vector_dim)
+        cells = self._locate(n, devices=devices, lat=lat, lon=lon)
+        valid = (cells >= 0) & (event_ids >= 0) & (event_ids < len(self.events)) & (prob >= self.min_probability)
+        self.skipped += int(n - valid.sum())
+        if not valid.all():
+            ts, event_ids, prob, vectors, cells = ts[valid], event_ids[valid], prob[valid], vectors[valid], cells[valid]
+        if len(ts) == 0:
+            return
+        bins = np.floor(ts / self.bin_seconds).astype(np.int64)
+        latest = int(bins.max())
+        self.latest_bin = latest if self.latest_bin is None else max(self.latest_bin, latest)
+        # events older than the retention window go straight to the long-term totals
+        old = bins <= self.latest_bin - self.retention_bins
+        if old.any():
+            self.archive.add(cells[old], np.zeros(int(old.sum()), dtype=np.int64), event_ids[old], prob[old], vectors[old])
+            fresh = ~old
+            cells, bins, event_ids, prob, vectors = cells[fresh], bins[fresh], event_ids[fresh], prob[fresh], vectors[fresh]
+        self.recent.add(cells, bins, event_ids, prob, vectors)
+        self.ingested += int(valid.sum())
+        if self._last_compact_bin is None:
+            self._last_compact_bin = self.latest_bin
+        elif self.latest_bin - self._last_compact_bin >= self.compact_every_bins:
+            self.compact()
+
+    def compact(self, now=None):
+        """Fold fine bins older than the retention window into per-cell totals. Returns rows removed."""
+        self.flush()
+        if self.recent.size == 0:
+            return 0
+        now_bin = self._now_bin(now)
+        keys, counts, prob_sum, vec_sum = self.recent.view()
+        old = keys[:, 1] <= now_bin - self.retention_bins
+        removed = int(old.sum())
+        if removed:
+            cells = keys[old, 0]
+            uniq, inv = np.unique(cells, return_inverse=True)
+            rows = self.archive.rows_for(uniq, np.zeros(len(uniq), dtype=np.int64))
+            nu = len(uniq)
+            k = len(self.events)
+            agg_counts = np.zeros((nu, k), dtype=np.int64)
+            agg_prob = np.zeros((nu, k), dtype=np.float64)
+            agg_vec = np.zeros((nu, self.vector_dim), dtype=np.float64)
+            np.add.at(agg_counts, inv, counts[old])
+            np.add.at(agg_prob, inv, prob_sum[old])
+            np.add.at(agg_vec, inv, vec_sum[old])
+            self.archive.counts[rows] += agg_counts.astype(np.int32)
+            self.archive.prob_sum[rows] += agg_prob.astype(np.float32)
+            self.archive.vec_sum[rows] += agg_vec.astype(np.float32)
+            self.recent.keep(~old)
+        self._last_compact_bin = now_bin
+        return removed
+
+    def _now_bin(self, now):
+        if now is not None:
+            return int(np.floor(now / self.bin_seconds))
+        return self.latest_bin if self.latest_bin is not None else 0
+
+    def _window(self, window_seconds, now):
+        self.flush()
+        now_bin = self._now_bin(now)
+        nbins = max(1, int(np.ceil(window_seconds / self.bin_seconds)))
+        keys, counts, prob_sum, vec_sum = self.recent.view()
+        mask = (keys[:, 1] > now_bin - nbins) & (keys[:, 1] <= now_bin)
+        return keys[mask], counts[mask], prob_sum[mask], vec_sum[mask]
+
+    def _cell_record(self, cell, **values):
+        lat, lon = geohash_decode(cell, self.precision)
+        record = {'cell': geohash_to_str(cell, self.precision), 'lat': float(lat[0]), 'lon': float(lon[0])}
+        record.update(values)
+        return record
+
+    def top_k(self, event='mugging', k=10, window_seconds=3600, now=None, min_events=1):
+        """Cells with the highest share of `event` among all events in the last `window_seconds`."""
+        e = self._event_ids[event] if isinstance(event, str) else int(event)
+        keys, counts, prob_sum, _ = self._window(window_seconds, now)
+        if len(keys) == 0:
+            return []
+        cells, inv = np.unique(keys[:, 0], return_inverse=True)
+        inv = inv.ravel()
+        totals = np.bincount(inv, weights=counts.sum(axis=1), minlength=len(cells))
+        hits = np.bincount(inv, weights=counts[:, e], minlength=len(cells))
+        mean_prob = np.bincount(inv, weights=prob_sum[:, e], minlength=len(cells))
+        eligible = np.flatnonzero(totals >= min_events)
+        rate = hits[eligible] / totals[eligible]
+        # highest rate first, more events break ties
+        order = np.lexsort((-hits[eligible], -rate))[:k]
+        out = []
+        for j in eligible[order]:
+            out.append(self._cell_record(cells[j], rate=float(hits[j] / totals[j]), count=int(hits[j]), total=int(totals[j]),
+                                         mean_probability=float(mean_prob[j] / hits[j]) if hits[j] else 0.0))
+        return out
+
+    def rolling_rate(self, cell, event='mugging', window_seconds=3600, now=None, span_seconds=None):
+        """
+        Rolling `event` rate for one cell (geohash string or int): returns (bin_start_times, rates, counts)
+        where each point covers the preceding `window_seconds`. `span_seconds` defaults to the retention.
+        """
+        self.flush()
+        if isinstance(cell, str):
+            cell = geohash_from_str(cell)
+        e = self._event_ids[event] if isinstance(event, str) else int(event)
+        now_bin = self._now_bin(now)
+        span = self.retention_bins if span_seconds is None else max(1, int(np.ceil(span_seconds / self.bin_seconds)))
+        first = now_bin - span + 1
+        keys, counts, _, _ = self.recent.view()
+        mask = (keys[:, 0] == cell) & (keys[:, 1] >= first) & (keys[:, 1] <= now_bin)
+        offsets = keys[mask, 1] - first
+        totals = np.bincount(offsets, weights=counts[mask].sum(axis=1), minlength=span)
+        hits = np.bincount(offsets, weights=counts[mask, e], minlength=span)
+        w = max(1, int(np.ceil(window_seconds / self.bin_seconds)))
+        csum_t = np.concatenate([[0.0], np.cumsum(totals)])
+        csum_h = np.concatenate([[0.0], np.cumsum(hits)])
+        idx = np.arange(1, span + 1)
+        roll_t = csum_t[idx] - csum_t[np.maximum(0, idx - w)]
+        roll_h = csum_h[idx] - csum_h[np.maximum(0, idx - w)]
+        rates = np.divide(roll_h, roll_t, out=np.zeros(span), where=roll_t > 0)
+        times = (first + np.arange(span)) * self.bin_seconds
+        return times, rates, roll_h.astype(np.int64)
+
+    def flow_anomalies(self, k=10, window_seconds=3600, now=None, min_events=10):
+        """
+        Cells whose mean movement vector over the last `window_seconds` deviates most from the cell's
+        baseline (everything older: compacted totals plus earlier fine bins).
+        """
+        self.flush()
+        now_bin = self._now_bin(now)
+        nbins = max(1, int(np.ceil(window_seconds / self.bin_seconds)))
+        keys, counts, _, vec_sum = self.recent.view()
+        recent_mask = (keys[:, 1] > now_bin - nbins) & (keys[:, 1] <= now_bin)
+        akeys, acounts, _, avec = self.archive.view()
+        base_cells = np.concatenate([keys[~recent_mask, 0], akeys[:, 0]])
+        base_n = np.concatenate([counts[~recent_mask].sum(axis=1), acounts.sum(axis=1)])
+        base_v = np.concatenate([vec_sum[~recent_mask], avec])
+        cells, inv = np.unique(keys[recent_mask, 0], return_inverse=True)
+        if len(cells) == 0:
+            return []
+        inv = inv.ravel()
+        n_recent = np.bincount(inv, weights=counts[recent_mask].sum(axis=1), minlength=len(cells))
+        v_recent = np.stack([np.bincount(inv, weights=vec_sum[recent_mask, d], minlength=len(cells))
+                             for d in range(self.vector_dim)], axis=1)
+        pos = np.searchsorted(cells, base_cells)
+        known = (pos < len(cells)) & (cells[np.minimum(pos, len(cells) - 1)] == base_cells)
+        n_base = np.bincount(pos[known], weights=base_n[known], minlength=len(cells))
+        v_base = np.stack([np.bincount(pos[known], weights=base_v[known, d], minlength=len(cells))
+                           for d in range(self.vector_dim)], axis=1)
+        ok = (n_recent >= min_events) & (n_base >= min_events)
+        if not ok.any():
+            return []
+        mean_recent = v_recent[ok] / n_recent[ok, None]
+        mean_base = v_base[ok] / n_base[ok, None]
+        score = np.linalg.norm(mean_recent - mean_base, axis=1)
+        order = np.argsort(-score)[:k]
+        idx = np.flatnonzero(ok)[order]
+        return [self._cell_record(cells[j], score=float(score[o]), recent_mean=mean_recent[o].tolist(),
+                                  baseline_mean=mean_base[o].tolist(), recent_events=int(n_recent[j]))
+                for j, o in zip(idx, order)]
+
+    def memory_bytes(self):
+        return self.recent.nbytes() + self.archive.nbytes()
+
+    def __len__(self):
+        return self.recent.size
@@ -0,0 +1,202 @@
+"""
+Minimal benchmark runner with JSON baselines and regression gating.
+
+Benchmarks register with the `@benchmark` decorator. The decorated function receives a scratch
+directory, performs any (untimed) setup and returns a zero-argument callable; only that callable is timed.
+Raise `SkipBenchmark` from setup when an optional dependency (e.g. TensorFlow) is missing.
+
+Usage:
+    python -m src.bench.runner                                    # run and print
+    python -m src.bench.runner --save artifacts/benchmarks/baseline.json
+    python -m src.bench.runner --compare artifacts/benchmarks/baseline.json --tolerance 0.25
+    python -m src.bench.runner --filter tflite
+
+Compare mode exits with status 1 when any benchmark's median is slower than the baseline by more
+than the tolerance (fraction, 0.25 = 25%). Baselines are machine-specific: record them on the same
+device (or CI runner class) the comparison will run on.
+"""
+import os
+import sys
+import gc
+import json
+import time
+import platform
+import tempfile
+import statistics
+
+BENCHMARKS = {}
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+def benchmark(name, group=None):
+    """Register a benchmark setup function under `name`."""
+    def decorator(fn):
+        if name in BENCHMARKS:
+            raise ValueError(f"Duplicate benchmark name: {name}")
+        BENCHMARKS[name] = {'setup': fn, 'group': group or name.split('.')[0]}
+        return fn
+    return decorator
+
+
+def _calibrate(fn, min_round_time):
+    """Pick how many calls make up one timed round so very fast callables are not timer-bound."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time or loops >= 1 << 20:
+            return loops
+        loops *= 10 if elapsed < min_round_time / 10 else 2
+
+
+def time_callable(fn, min_rounds=5, max_time=1.0, min_round_time=0.001, warmup=1):
+    """Time `fn` and return per-call statistics in seconds."""
+    for _ in range(warmup):
+        fn()
+    loops = _calibrate(fn, min_round_time)
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        deadline = time.perf_counter() + max_time
+        while len(samples) < min_rounds or time.perf_counter() < deadline:
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            samples.append((time.perf_counter() - start) / loops)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'rounds': len(samples),
+        'loops': loops,
+    }
+
+
+def run_benchmarks(select=None, min_rounds=5, max_time=1.0):
+    """Run registered benchmarks whose name contains `select` (all if None). Returns {name: stats}."""
+    results = {}
+    for name in sorted(BENCHMARKS):
+        if select and select not in name:
+            continue
+        entry = BENCHMARKS[name]
+        with tempfile.TemporaryDirectory(prefix='citysafesense_bench_') as workdir:
+            try:
+                fn = entry['setup'](workdir)
+            except SkipBenchmark as e:
+                print(f"{name:<48} skipped ({e})")
+                continue
+            stats = time_callable(fn, min_rounds=min_rounds, max_time=max_time)
+        stats['group'] = entry['group']
+        results[name] = stats
+        print(f"{name:<48} median {stats['median'] * 1e3:10.3f} ms  min {stats['min'] * 1e3:10.3f} ms  ({stats['rounds']} rounds)")
+    return results
+
+
+def machine_info():
+    import numpy as np
+    return {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    payload = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'machine': machine_info(), 'benchmarks': results}
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    print("Saved benchmark results to", path)
+    return path
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)['benchmarks']
+
+
+def compare_results(results, baseline, tolerance=0.2, stat='median'):
+    """
+    Compare `results` to `baseline` ({name: stats}). Returns a list of rows
+    (name, baseline, current, ratio, status) where status is 'ok', 'regression', 'improved', 'new'
+    or 'missing' (in the baseline but not run now; current is None).
+    """
+    rows = []
+    for name in sorted(set(results) | set(baseline)):
+        if name not in results:
+            rows.append((name, baseline[name][stat], None, None, 'missing'))
+            continue
+        current = results[name][stat]
+        if name not in baseline:
+            rows.append((name, None, current, None, 'new'))
+            continue
+        base = baseline[name][stat]
+        ratio = current / base if base > 0 else float('inf')
+        if ratio > 1.0 + tolerance:
+            status = 'regression'
+        elif ratio < 1.0 - tolerance:
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append((name, base, current, ratio, status))
+    return rows
+
+
+def print_comparison(rows):
+    for name, base, current, ratio, status in rows:
+        if current is None:
+            print(f"{name:<48} {base * 1e3:10.3f} ms {'-':>13}  {'':>7}  {status}")
+        elif base is None:
+            print(f"{name:<48} {'-':>12} {current * 1e3:10.3f} ms  {'':>7}  {status}")
+        else:
+            print(f"{name:<48} {base * 1e3:10.3f} ms {current * 1e3:10.3f} ms  x{ratio:5.2f}  {status}")
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Run CitySafeSense benchmarks')
+    parser.add_argument('--filter', default=None, help='Only run benchmarks whose name contains this string')
+    parser.add_argument('--save', default=None, help='Write results as a JSON baseline to this path')
+    parser.add_argument('--compare', default=None, help='Compare against a JSON baseline and fail on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown as a fraction of the baseline median (default 0.2)')
+    parser.add_argument('--min_rounds', type=int, default=5)
+    parser.add_argument('--max_time', type=float, default=1.0, help='Seconds spent timing each benchmark')
+    args = parser.parse_args(argv)
+
+    # register the suite; go through the imported module so `python -m` (which runs this file
+    # as __main__) sees the same BENCHMARKS registry the suite populates
+    from src.bench import suite, runner  # noqa: F401
+
+    results = runner.run_benchmarks(select=args.filter, min_rounds=args.min_rounds, max_time=args.max_time)
+    if args.save:
+        save_results(results, args.save)
+    if args.compare:
+        rows = compare_results(results, load_results(args.compare), tolerance=args.tolerance)
+        print()
+        print_comparison(rows)
+        regressions = [r[0] for r in rows if r[4] == 'regression']
+        # with --filter, baseline entries outside the selection are expected to be absent
+        missing = [] if args.filter else [r[0] for r in rows if r[4] == 'missing']
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        if missing:
+            print(f"\n{len(missing)} baseline benchmark(s) did not run: {', '.join(missing)}")
+        if regressions or missing:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Benchmarks for the core numeric paths: synthetic generation, recording reads (CSV vs columnar), resampling,
+windowing, representative-dataset sampling, hotspot aggregation, TCN forward passes and TFLite invoke latency.
+
+All inputs are generated locally with fixed seeds so runs are comparable across commits.
+TensorFlow-backed benchmarks are skipped when TensorFlow is not installed.
+"""
+import os
+import numpy as np
+import pandas as pd
+from src.bench.runner import benchmark, SkipBenchmark
+
+SEQ_LEN = 100
+FEATURES = 10
+
+
+def _irregular_frame(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    offsets = np.cumsum(rng.integers(15, 31, size=n))
+    df = pd.DataFrame(rng.standard_normal((n, 7)), columns=['ax', 'ay', 'az', 'gx', 'gy', 'gz', 'speed'])
+    df.insert(0, 'timestamp', pd.Timestamp('2025-01-01') + pd.to_timedelta(offsets, unit='ms'))
+    return df
+
+
+def _write_windows(folder, n=200, seed=0):
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for i in range(n):
+        np.save(os.path.join(folder, f"bench_{i}.npy"), rng.standard_normal((SEQ_LEN, FEATURES)).astype('float32'))
+    return folder
+
+
+def _require_tf():
+    try:
+        import tensorflow as tf
+    except ImportError:
+        raise SkipBenchmark('tensorflow not installed')
+    return tf
+
+
+@benchmark('synth.generate_sequence_60s')
+def bench_generate_sequence(workdir):
+    from src.tools.generate_synthetic import generate_sequence
+
+    def run():
+        np.random.seed(0)
+        generate_sequence(duration_s=60)
+    return run
+
+
+@benchmark('preprocess.resample_dataframe_3k')
+def bench_resample(workdir):
+    from src.tools.csv_to_windows import _resample_dataframe
+    df = _irregular_frame()
+    return lambda: _resample_dataframe(df, 'timestamp', 50)
+
+
+@benchmark('preprocess.process_file_3k')
+def bench_process_file(workdir):
+    from src.tools.csv_to_windows import process_file
+    path = os.path.join(workdir, 'bench.csv')
+    _irregular_frame().to_csv(path, index=False)
+    out = os.path.join(workdir, 'rep_windows')
+    os.makedirs(out)
+    return lambda: process_file(path, None, seq_len=SEQ_LEN, stride=50, out_folder=out, target_hz=50)
+
+
+def _large_recording(workdir, n=200000):
+    path = os.path.join(workdir, 'large.csv')
+    _irregular_frame(n=n).to_csv(path, index=False)
+    return path
+
+
+@benchmark('recording.read_csv_200k')
+def bench_read_csv(workdir):
+    path = _large_recording(workdir)
+    return lambda: pd.to_datetime(pd.read_csv(path)['timestamp'])
+
+
+@benchmark('recording.read_columnar_200k')
+def bench_read_columnar(workdir):
+    from src.tools import columnar
+    out = os.path.join(workdir, 'large.cols')
+    columnar.csv_to_columnar(_large_recording(workdir), out)
+    return lambda: columnar.read_columnar(out)
+
+
+@benchmark('recording.read_columnar_compressed_200k')
+def bench_read_columnar_compressed(workdir):
+    from src.tools import columnar
+    out = os.path.join(workdir, 'large.cols')
+    columnar.csv_to_columnar(_large_recording(workdir), out, compress=True)
+    return lambda: columnar.read_columnar(out)
+
+
+@benchmark('representative.sample_folder_100')
+def bench_representative_folder(workdir):
+    from src.tools.representative_dataset import representative_generator
+    folder = _write_windows(os.path.join(workdir, 'rep_windows'))
+    return lambda: list(representative_generator(num_samples=100, folder=folder))
+
+
+@benchmark('representative.sample_store_100')
+def bench_representative_store(workdir):
+    from src.tools.representative_dataset import representative_generator
+    rng = np.random.default_rng(0)
+    np.save(os.path.join(workdir, 'windows.npy'), rng.standard_normal((2000, SEQ_LEN, FEATURES)).astype('float32'))
+    folder = os.path.join(workdir, 'rep_windows')
+    return lambda: list(representative_generator(num_samples=100, folder=folder, seed=0))
+
+
+@benchmark('representative.sample_fallback_100')
+def bench_representative_fallback(workdir):
+    from src.tools.representative_dataset import representative_generator
+    sample = os.path.join(workdir, 'sample.npy')
+    np.save(sample, np.random.default_rng(0).standard_normal((20000, FEATURES)).astype('float32'))
+    missing = os.path.join(workdir, 'missing')
+    return lambda: list(representative_generator(num_samples=100, sample_path=sample, folder=missing))
+
+
+def _hotspot_events(n, devices=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    names = [f'dev{i}' for i in range(devices)]
+    locations = {d: (-23.55 + rng.normal(0, 0.05), -46.63 + rng.normal(0, 0.05)) for d in names}
+    ts = np.sort(rng.uniform(0, 86400, n))
+    return locations, (ts, rng.choice(3, n, p=[0.7, 0.25, 0.05]), rng.uniform(0.5, 1.0, n),
+                       rng.standard_normal((n, 2)), np.array(names)[rng.integers(0, devices, n)])
+
+
+@benchmark('hotspot.ingest_100k')
+def bench_hotspot_ingest(workdir):
+    from src.analytics.hotspots import HotspotIndex
+    locations, (ts, ev, prob, vec, dev) = _hotspot_events(100000)
+
+    def run():
+        index = HotspotIndex(device_locations=locations)
+        for s in range(0, len(ts), 10000):
+            index.add_batch(ts[s:s + 10000], ev[s:s + 10000], prob[s:s + 10000], vectors=vec[s:s + 10000], devices=dev[s:s + 10000])
+    return run
+
+
+@benchmark('hotspot.top_k_last_hour_1m')
+def bench_hotspot_top_k(workdir):
+    from src.analytics.hotspots import HotspotIndex
+    locations, (ts, ev, prob, vec, dev) = _hotspot_events(1000000)
+    index = HotspotIndex(device_locations=locations)
+    for s in range(0, len(ts), 100000):
+        index.add_batch(ts[s:s + 100000], ev[s:s + 100000], prob[s:s + 100000], vectors=vec[s:s + 100000], devices=dev[s:s + 100000])
+    return lambda: index.top_k('mugging', k=10, window_seconds=3600)
+
+
+def _forward(batch_size):
+    def setup(workdir):
+        tf = _require_tf()
+        from src.model.tcn import build_tcn
+        tf.keras.utils.set_random_seed(0)
+        model = build_tcn(input_shape=(SEQ_LEN, FEATURES))
+        x = tf.constant(np.random.default_rng(0).standard_normal((batch_size, SEQ_LEN, FEATURES)).astype('float32'))
+        infer = tf.function(lambda t: model(t, training=False))
+        infer(x)
+        return lambda: infer(x).numpy()
+    return setup
+
+
+for _bs in (1, 8, 32):
+    benchmark(f'model.tcn_forward_bs{_bs}')(_forward(_bs))
+
+
+def _tflite_invoke(variant):
+    def setup(workdir):
+        tf = _require_tf()
+        from src.model.tcn import build_tcn
+        from src.model.export_tflite import export_model_to_tflite
+        from src.model.tflite_runner import TFLiteClassifier
+        from src.tools.representative_dataset import representative_generator
+        tf.keras.utils.set_random_seed(0)
+        model = build_tcn(input_shape=(SEQ_LEN, FEATURES))
+        out = os.path.join(workdir, f'{variant}.tflite')
+        rep = None
+        if variant == 'int8':
+            folder = _write_windows(os.path.join(workdir, 'rep_windows'), n=50)
+            rep = lambda: representative_generator(num_samples=50, folder=folder)  # noqa: E731
+        export_model_to_tflite(model, out, quantize=variant != 'float32', representative_data=rep)
+        clf = TFLiteClassifier(out, num_threads=1)
+        window = np.random.default_rng(0).standard_normal((SEQ_LEN, FEATURES)).astype('float32')
+        return lambda: clf.predict(window)
+    return setup
+
+
+for _variant in ('float32', 'dynamic', 'int8'):
+    benchmark(f'tflite.invoke_{_variant}')(_tflite_invoke(_variant))
@@ -21,5 +21,15 @@ def train(epochs):
     """Run a tiny training demo"""
     train_demo.main(int(epochs))
 
+@cli.command()
+@click.option('--data_dir', default='data', help='Folder with windows.npy/metadata.json or rep_windows/')
+@click.option('--out_dir', default='reports', help='Output folder for PDFs')
+@click.option('--group_by', default='source', help='Metadata key to split reports by')
+@click.option('--workers', default=None, type=int, help='Render processes')
+def report(data_dir, out_dir, group_by, workers):
+    """Render window corpora into per-group PDF review packs"""
+    from src.visualize.report import generate_reports
+    generate_reports(data_dir=data_dir, out_dir=out_dir, group_by=group_by, workers=workers)
+
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,493 @@
+"""
+Asyncio MQTT ingestion client: subscribe -> decode -> per-device windowing -> inference.
+
+paho-mqtt is driven from the asyncio event loop through its external-socket hooks (no paho network
+thread). Stages are connected by bounded queues:
+
+    socket --on_message--> raw queue (asyncio.Queue) --decode--> per-device frame buffers
+        --windowing--> window queue (drop-oldest per device) --inference workers--> on_result
+
+Backpressure and drop policies:
+- raw queue: when it reaches `raw_maxsize` the client stops reading the MQTT socket, so TCP flow control
+  pushes back on the broker; reading resumes once the queue drains below half. Messages that still
+  arrive while full (a single socket read can carry many) are dropped and counted. Reads are never paused
+  for longer than `max_pause` (default keepalive / 4): the socket is then read for `drain_seconds`,
+  dropping what does not fit, so keepalive replies get through and the broker does not drop the client.
+- window queue: at most `max_windows_per_device` pending windows per device and `window_maxsize`
+  overall; on overflow the oldest window of that device (or of the busiest device) is dropped, so
+  inference always works on the freshest data. Devices are served round-robin.
+- inference runs in a thread pool (or an InterpreterPool via its `submit`) so the loop never stalls.
+- per-device frame buffers are kept in LRU order: a device silent for `device_idle_seconds` loses its
+  buffer (its next frame starts a fresh window), and at most `max_devices` buffers are held, evicting the
+  least recently seen device, so churning device ids cannot grow memory without bound.
+
+Connection loss (broker restart, keepalive timeout) is retried in the background with exponential
+backoff between `reconnect_min_delay` and `reconnect_max_delay`; the subscription is renewed on
+reconnect. The blocking TCP connect runs in the default executor, off the event loop.
+
+Queue depths, buffered devices, drops, evictions and reconnects are exported through src.monitoring.metrics and `stats()`.
+
+Payload: JSON {"ts": float, "frame": [F floats], "device": optional str}. The device id defaults to
+the last topic level below the subscribed prefix (citysafesense/sensor/<device>).
+
+Usage:
+    python -m src.ingest.mqtt_ingest --broker localhost --model checkpoints/model.tflite
+"""
+import json
+import time
+import asyncio
+import threading
+import inspect
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import paho.mqtt.client as mqtt
+from src.monitoring import metrics
+
+
+def make_client(client_id=''):
+    # paho-mqtt >= 2.0 requires choosing a callback API version; 1.x has no such argument
+    if hasattr(mqtt, 'CallbackAPIVersion'):
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+    return mqtt.Client(client_id=client_id)
+
+
+class DropOldestQueue:
+    """
+    Bounded asyncio queue of (device, item) keyed by device. Putting never blocks: on overflow the
+    oldest item of the same device is evicted (or of the device with most pending items when the
+    global limit is hit). `get()` serves devices round-robin.
+    """
+
+    def __init__(self, maxsize=256, max_per_device=4):
+        self.maxsize = maxsize
+        self.max_per_device = max_per_device
+        self._items = OrderedDict()
+        self._size = 0
+        self._not_empty = asyncio.Event()
+        self.dropped = 0
+
+    def qsize(self):
+        return self._size
+
+    def put_nowait(self, device, item):
+        """Enqueue and return the evicted item (or None)."""
+        dq = self._items.get(device)
+        if dq is None:
+            dq = self._items[device] = deque()
+        evicted = None
+        if len(dq) >= self.max_per_device:
+            evicted = dq.popleft()
+            self._size -= 1
+        elif self._size >= self.maxsize:
+            busiest = max(self._items, key=lambda d: len(self._items[d]))
+            evicted = self._items[busiest].popleft()
+            self._size -= 1
+        dq.append(item)
+        self._size += 1
+        if evicted is not None:
+            self.dropped += 1
+        self._not_empty.set()
+        return evicted
+
+    def get_nowait(self):
+        while self._items:
+            device, dq = next(iter(self._items.items()))
+            # rotate: this device goes to the back
+            self._items.move_to_end(device)
+            if dq:
+                self._size -= 1
+                item = dq.popleft()
+                if not dq:
+                    del self._items[device]
+                if self._size == 0:
+                    self._not_empty.clear()
+                return device, item
+            del self._items[device]
+        self._not_empty.clear()
+        raise asyncio.QueueEmpty
+
+    async def get(self):
+        while True:
+            try:
+                return self.get_nowait()
+            except asyncio.QueueEmpty:
+                await self._not_empty.wait()
+
+
+class _DeviceBuffer:
+    __slots__ = ('frames', 'since_last', 'last_ts', 'last_seen', 'primed')
+
+    def __init__(self, seq_len):
+        self.frames = deque(maxlen=seq_len)
+        self.since_last = 0
+        self.last_ts = None
+        self.last_seen = time.monotonic()
+        # set once the first full window has been emitted; later windows follow `stride`
+        self.primed = False
+
+
+class _AsyncioHelper:
+    """
+    Drives a paho client's socket from an asyncio loop (add_reader/add_writer + periodic loop_misc).
+    Socket callbacks may fire on an executor thread (connect/reconnect); they are handed to the loop thread.
+    """
+
+    def __init__(self, loop, client, max_pause=15.0, drain_seconds=1.0, tick=1.0):
+        self.loop = loop
+        self.client = client
+        self.sock = None
+        self.paused = False
+        self.paused_at = None
+        self.max_pause = max_pause
+        self.drain_seconds = drain_seconds
+        self.tick = tick
+        self.forced_reads = 0
+        self._draining_until = 0.0
+        self.misc = None
+        self._thread = threading.get_ident()
+        client.on_socket_open = self.on_socket_open
+        client.on_socket_close = self.on_socket_close
+        client.on_socket_register_write = self.on_socket_register_write
+        client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    def _on_loop(self, fn, *args):
+        if threading.get_ident() == self._thread:
+            fn(*args)
+        else:
+            self.loop.call_soon_threadsafe(fn, *args)
+
+    def on_socket_open(self, client, userdata, sock):
+        self._on_loop(self._open, sock)
+
+    def _open(self, sock):
+        self.sock = sock
+        if not self.paused:
+            self.loop.add_reader(sock, self.client.loop_read)
+        self.misc = self.loop.create_task(self._misc_loop())
+
+    def on_socket_close(self, client, userdata, sock):
+        # runs before paho closes the socket, so the fd is still valid here
+        self._on_loop(self._close, sock)
+
+    def _close(self, sock):
+        self.loop.remove_reader(sock)
+        self.loop.remove_writer(sock)
+        self.sock = None
+        if self.misc is not None:
+            self.misc.cancel()
+            self.misc = None
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self._on_loop(self.loop.add_writer, sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self._on_loop(self.loop.remove_writer, sock)
+
+    def pause_reading(self):
+        if not self.paused and time.monotonic() >= self._draining_until:
+            self.paused = True
+            self.paused_at = time.monotonic()
+            if self.sock is not None:
+                self.loop.remove_reader(self.sock)
+
+    def resume_reading(self):
+        if self.paused:
+            self.paused = False
+            if self.sock is not None:
+                self.loop.add_reader(self.sock, self.client.loop_read)
+
+    async def _misc_loop(self):
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            if self.paused and time.monotonic() - self.paused_at >= self.max_pause:
+                # keep reading for a while even though the raw queue is full, so PINGRESP is seen
+                self._draining_until = time.monotonic() + self.drain_seconds
+                self.forced_reads += 1
+                metrics.inc('ingest_forced_reads_total')
+                self.resume_reading()
+            await asyncio.sleep(self.tick)
+
+
+class MQTTIngestClient:
+    def __init__(self, predictor, broker='localhost', port=1883, topic='citysafesense/sensor/#', seq_len=100, stride=50,
+                 raw_maxsize=1024, window_maxsize=256, max_windows_per_device=4, inference_workers=2, on_result=None,
+                 executor=None, client_id='', keepalive=60, max_pause=None, drain_seconds=1.0, reconnect_min_delay=1.0,
+                 reconnect_max_delay=60.0, max_devices=10000, device_idle_seconds=300.0):
+        """
+        predictor: callable(window (seq_len, F) float32) -> probabilities, or an object with `submit(window)`
+                   returning a concurrent Future (e.g. InterpreterPool)
+        on_result: optional callable(device, ts, probs) (may be a coroutine function)
+        max_pause: longest socket-read pause under backpressure, seconds (default keepalive / 4)
+        max_devices / device_idle_seconds: cap and idle timeout of the per-device frame buffers
+        """
+        self.predictor = predictor
+        self.broker = broker
+        self.port = port
+        self.topic = topic
+        self.topic_prefix = topic.rstrip('#').rstrip('/')
+        self.seq_len = seq_len
+        self.stride = stride
+        self.raw_maxsize = raw_maxsize
+        self.window_maxsize = window_maxsize
+        self.max_windows_per_device = max_windows_per_device
+        self.inference_workers = inference_workers
+        self.on_result = on_result
+        self.client_id = client_id
+        self.keepalive = keepalive
+        self.max_pause = keepalive / 4.0 if max_pause is None else max_pause
+        self.drain_seconds = drain_seconds
+        self.reconnect_min_delay = reconnect_min_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self._executor = executor
+        self._own_executor = False
+        self.max_devices = max_devices
+        self.device_idle_seconds = device_idle_seconds
+        # least recently seen device first
+        self._buffers = OrderedDict()
+        self._tasks = []
+        self._reconnect_task = None
+        self._stopping = False
+        self._counts = {'messages': 0, 'decode_errors': 0, 'raw_dropped': 0, 'windows': 0, 'inferences': 0,
+                        'inference_errors': 0, 'disconnects': 0, 'reconnects': 0, 'buffers_evicted': 0}
+        self.subscribed = None
+        self.raw_queue = None
+        self.window_queue = None
+
+    # paho callbacks (run on the event loop thread)
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        client.subscribe(self.topic, qos=0)
+
+    def _on_subscribe(self, client, userdata, mid, *args):
+        self.subscribed.set()
+
+    def _on_disconnect(self, client, userdata, *args):
+        if self._stopping:
+            return
+        self._counts['disconnects'] += 1
+        metrics.inc('ingest_disconnects_total')
+        print(f"MQTT connection to {self.broker}:{self.port} lost; reconnecting")
+        self._loop.call_soon_threadsafe(self._schedule_reconnect)
+
+    def _schedule_reconnect(self):
+        if self._stopping or (self._reconnect_task is not None and not self._reconnect_task.done()):
+            return
+        self._reconnect_task = self._loop.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        delay = self.reconnect_min_delay
+        while not self._stopping:
+            await asyncio.sleep(delay)
+            try:
+                await self._loop.run_in_executor(None, self.client.reconnect)
+            except (OSError, ValueError) as e:
+                metrics.inc('ingest_reconnect_failures_total')
+                print(f"MQTT reconnect to {self.broker}:{self.port} failed ({e}); retrying in {min(delay * 2, self.reconnect_max_delay):.1f}s")
+                delay = min(delay * 2, self.reconnect_max_delay)
+                continue
+            self._counts['reconnects'] += 1
+            metrics.inc('ingest_reconnects_total')
+            return
+
+    def _on_message(self, client, userdata, msg):
+        self._counts['messages'] += 1
+        try:
+            self.raw_queue.put_nowait((msg.topic, msg.payload))
+        except asyncio.QueueFull:
+            self._counts['raw_dropped'] += 1
+            metrics.inc('ingest_dropped_total', labels={'stage': 'raw'})
+        if self.raw_queue.qsize() >= self.raw_maxsize:
+            self._helper.pause_reading()
+
+    def _device_for(self, topic, payload):
+        device = payload.get('device')
+        if device:
+            return str(device)
+        if topic.startswith(self.topic_prefix + '/'):
+            return topic[len(self.topic_prefix) + 1:]
+        return topic
+
+    def _decode(self, topic, raw):
+        payload = json.loads(raw)
+        frame = np.asarray(payload['frame'], dtype='float32')
+        return self._device_for(topic, payload), payload.get('ts'), frame
+
+    def _evict(self, reason):
+        self._buffers.popitem(last=False)
+        self._counts['buffers_evicted'] += 1
+        metrics.inc('ingest_buffers_evicted_total', labels={'reason': reason})
+
+    def _window(self, device, ts, frame):
+        now = time.monotonic()
+        buf = self._buffers.get(device)
+        if buf is None:
+            if len(self._buffers) >= self.max_devices:
+                self._evict('lru')
+            buf = self._buffers[device] = _DeviceBuffer(self.seq_len)
+        else:
+            self._buffers.move_to_end(device)
+        buf.last_seen = now
+        # the front is the least recently seen device, so idle buffers are found without a scan
+        while self._buffers:
+            oldest = next(iter(self._buffers.values()))
+            if now - oldest.last_seen < self.device_idle_seconds:
+                break
+            self._evict('idle')
+        if buf.frames and frame.shape != buf.frames[-1].shape:
+            # device changed its frame layout; start a fresh window
+            buf.frames.clear()
+            buf.since_last = 0
+            buf.primed = False
+        buf.frames.append(frame)
+        buf.last_ts = ts
+        buf.since_last += 1
+        if len(buf.frames) < self.seq_len:
+            return None
+        if buf.primed and buf.since_last < self.stride:
+            return None
+        buf.primed = True
+        buf.since_last = 0
+        win = np.stack(buf.frames)
+        # same per-window normalization as csv_to_windows.process_file
+        mean = np.mean(win, axis=0, keepdims=True)
+        std = np.std(win, axis=0, keepdims=True) + 1e-6
+        return (win - mean) / std
+
+    async def _decode_loop(self):
+        while True:
+            topic, raw = await self.raw_queue.get()
+            if self._helper.paused and self.raw_queue.qsize() <= self.raw_maxsize // 2:
+                self._helper.resume_reading()
+            try:
+                device, ts, frame = self._decode(topic, raw)
+            except Exception:
+                self._counts['decode_errors'] += 1
+                metrics.inc('ingest_decode_errors_total')
+                continue
+            win = self._window(device, ts, frame)
+            if win is not None:
+                self._counts['windows'] += 1
+                if self.window_queue.put_nowait(device, (ts, win)) is not None:
+                    metrics.inc('ingest_dropped_total', labels={'stage': 'window'})
+            self._export_depths()
+
+    def _export_depths(self):
+        if metrics.is_enabled():
+            metrics.set_gauge('ingest_queue_depth', self.raw_queue.qsize(), labels={'stage': 'raw'})
+            metrics.set_gauge('ingest_queue_depth', self.window_queue.qsize(), labels={'stage': 'window'})
+            metrics.set_gauge('ingest_device_buffers', len(self._buffers))
+
+    async def _infer(self, window):
+        submit = getattr(self.predictor, 'submit', None)
+        if submit is not None:
+            return await asyncio.wrap_future(submit(window))
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.predictor, window)
+
+    async def _inference_loop(self):
+        while True:
+            device, (ts, win) = await self.window_queue.get()
+            start = time.perf_counter()
+            try:
+                probs = await self._infer(win)
+            except Exception as e:
+                self._counts['inference_errors'] += 1
+                metrics.inc('ingest_inference_errors_total')
+                print("Inference failed for", device, ":", e)
+                continue
+            metrics.observe('ingest_inference_seconds', time.perf_counter() - start)
+            self._counts['inferences'] += 1
+            if self.on_result is not None:
+                res = self.on_result(device, ts, probs)
+                if inspect.isawaitable(res):
+                    await res
+            self._export_depths()
+
+    def stats(self):
+        out = dict(self._counts)
+        out['raw_depth'] = self.raw_queue.qsize() if self.raw_queue else 0
+        out['window_depth'] = self.window_queue.qsize() if self.window_queue else 0
+        out['device_buffers'] = len(self._buffers)
+        out['window_dropped'] = self.window_queue.dropped if self.window_queue else 0
+        out['paused'] = self._helper.paused if self.raw_queue else False
+        out['forced_reads'] = self._helper.forced_reads if self.raw_queue else 0
+        return out
+
+    async def start(self, timeout=10.0):
+        loop = self._loop = asyncio.get_running_loop()
+        self._stopping = False
+        self.subscribed = asyncio.Event()
+        self.raw_queue = asyncio.Queue(maxsize=self.raw_maxsize)
+        self.window_queue = DropOldestQueue(maxsize=self.window_maxsize, max_per_device=self.max_windows_per_device)
+        if self._executor is None and not hasattr(self.predictor, 'submit'):
+            self._executor = ThreadPoolExecutor(max_workers=self.inference_workers, thread_name_prefix='ingest-infer')
+            self._own_executor = True
+        self.client = make_client(self.client_id)
+        self.client.on_connect = self._on_connect
+        self.client.on_subscribe = self._on_subscribe
+        self.client.on_message = self._on_message
+        self.client.on_disconnect = self._on_disconnect
+        self._helper = _AsyncioHelper(loop, self.client, max_pause=self.max_pause, drain_seconds=self.drain_seconds)
+        self._tasks = [loop.create_task(self._decode_loop())]
+        self._tasks += [loop.create_task(self._inference_loop()) for _ in range(self.inference_workers)]
+        # DNS lookup and TCP connect block; keep them off the event loop
+        await loop.run_in_executor(None, self.client.connect, self.broker, self.port, self.keepalive)
+        await asyncio.wait_for(self.subscribed.wait(), timeout)
+        return self
+
+    async def stop(self):
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            await asyncio.gather(self._reconnect_task, return_exceptions=True)
+            self._reconnect_task = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.client.disconnect()
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._own_executor = False
+
+    async def run_forever(self):
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+
+def main(broker='localhost', port=1883, topic='citysafesense/sensor/#', model='checkpoints/model.tflite', seq_len=100,
+         stride=50, workers=2, metrics_port=None):
+    from src.model.interpreter_pool import InterpreterPool
+    if metrics_port:
+        metrics.start_http_server(port=metrics_port)
+    pool = InterpreterPool(model, workers=workers).start()
+
+    def report(device, ts, probs):
+        print(json.dumps({'device': device, 'ts': ts, 'event': int(np.argmax(probs)), 'probability': float(np.max(probs))}))
+
+    client = MQTTIngestClient(pool, broker=broker, port=port, topic=topic, seq_len=seq_len, stride=stride,
+                              inference_workers=workers, on_result=report)
+    try:
+        asyncio.run(client.run_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--broker', default='localhost')
+    parser.add_argument('--port', type=int, default=1883)
+    parser.add_argument('--topic', default='citysafesense/sensor/#')
+    parser.add_argument('--model', default='checkpoints/model.tflite', help='.tflite file or directory watched for new models')
+    parser.add_argument('--seq_len', type=int, default=100)
+    parser.add_argument('--stride', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=2, help='Inference worker threads')
+    parser.add_argument('--metrics_port', type=int, default=None, help='Serve Prometheus metrics on this port')
+    args = parser.parse_args()
+    main(broker=args.broker, port=args.port, topic=args.topic, model=args.model, seq_len=args.seq_len, stride=args.stride,
+         workers=args.workers, metrics_port=args.metrics_port)
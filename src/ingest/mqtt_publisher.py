@@ -5,6 +5,7 @@ import time
 import json
 import numpy as np
 import paho.mqtt.client as mqtt
+from src.monitoring import metrics
 
 def publish_loop(broker='localhost', port=1883, topic='citysafesense/sensor', fps=10):
     client = mqtt.Client()
@@ -18,7 +19,9 @@ def publish_loop(broker='localhost', port=1883, topic='citysafesense/sensor', fp
                 'ts': time.time(),
                 'frame': np.random.randn(10).tolist()
             }
-            client.publish(topic, json.dumps(payload))
+            with metrics.timer('mqtt_publish_seconds'):
+                client.publish(topic, json.dumps(payload))
+            metrics.inc('mqtt_published_total')
             time.sleep(1.0/fps)
     except KeyboardInterrupt:
         client.loop_stop()
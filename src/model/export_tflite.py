@@ -5,11 +5,13 @@ Works with a loaded tf.keras.Model or a path to a saved model.
 import tensorflow as tf
 import os
 
-def export_model_to_tflite(model_or_path, out_path='model.tflite', quantize=False, representative_data=None):
+def export_model_to_tflite(model_or_path, out_path='model.tflite', quantize=False, representative_data=None, int8_io=False):
     """
     model_or_path: tf.keras.Model instance or path to saved model (.keras or SavedModel dir)
     quantize: bool, if True apply default post-training quantization
     representative_data: a generator function returning representative tensor samples for full-int8 quantization (optional)
+    int8_io: restrict to int8 builtin ops with int8 input/output (integer-only kernels, as on TFLite Micro);
+             requires representative_data
     """
     # Load if a path is supplied
     if isinstance(model_or_path, str):
@@ -23,10 +25,21 @@ def export_model_to_tflite(model_or_path, out_path='model.tflite', quantize=Fals
         # Optionally set representative dataset for better quantization (if provided)
         if representative_data is not None:
             converter.representative_dataset = representative_data
+    if int8_io:
+        if representative_data is None:
+            raise ValueError("int8_io export needs representative_data")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_data
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
     tflite_model = converter.convert()
     os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
-    with open(out_path, 'wb') as f:
+    # write then rename so processes watching the directory (InterpreterPool) never see a partial file
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
         f.write(tflite_model)
+    os.replace(tmp_path, out_path)
     print(f"Exported TFLite model to {out_path}")
     return out_path
 
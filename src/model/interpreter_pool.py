@@ -0,0 +1,296 @@
+"""
+Thread pool of TFLite interpreters with hot model reload and optional shadow model.
+
+Each worker thread owns one interpreter (TFLite interpreters are not thread-safe), with
+`num_threads` split across cores. A watcher thread polls the model directory for a newer .tflite
+(e.g. written by export_model_to_tflite); the new version's interpreters are built and warmed up on
+representative windows from representative_dataset *off* the serving path, then swapped in with a
+single reference assignment. In-flight requests finish on the version they started with, so serving
+never pauses and no window is dropped.
+
+A shadow model can run side by side: every primary request is mirrored to a separate lane and the
+agreement (argmax match, max abs probability difference) is recorded without adding primary latency.
+The shadow lane is best-effort: it has its own (small) thread budget, and when `shadow_max_pending`
+mirrored requests are already queued, further ones are skipped (counted in shadow_skipped_total)
+instead of growing the queue without bound.
+
+Usage:
+    from src.model.interpreter_pool import InterpreterPool
+    pool = InterpreterPool('checkpoints', workers=2)
+    pool.start()
+    probs = pool.predict(window)          # or pool.submit(window) -> Future
+    pool.set_shadow('candidates/model_v2.tflite')
+    print(pool.shadow_report())
+    pool.stop()
+"""
+import os
+import glob
+import time
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.model.tflite_runner import TFLiteClassifier
+from src.monitoring import metrics
+
+
+def _latest_model(path, pattern='*.tflite'):
+    """Return (path, mtime) of `path` itself or of the newest file matching `pattern` inside it."""
+    if os.path.isfile(path):
+        return path, os.path.getmtime(path)
+    candidates = glob.glob(os.path.join(path, pattern))
+    if not candidates:
+        return None, None
+    newest = max(candidates, key=os.path.getmtime)
+    return newest, os.path.getmtime(newest)
+
+
+def _warmup_windows(input_shape, num_samples, folder="data/rep_windows"):
+    from src.tools.representative_dataset import representative_generator
+    shape = (1, int(input_shape[1]), int(input_shape[2]))
+    windows = [item[0] for item in representative_generator(num_samples=num_samples, seq_len=shape[1], features=shape[2], folder=folder, seed=0)]
+    windows = [w for w in windows if w.shape == shape]
+    if not windows:
+        # stored windows do not match this model's input; still exercise every op once
+        rng = np.random.default_rng(0)
+        windows = [rng.standard_normal(shape).astype('float32') for _ in range(num_samples)]
+    return windows
+
+
+class ModelVersion:
+    def __init__(self, path, mtime, classifiers):
+        self.path = path
+        self.mtime = mtime
+        self.classifiers = classifiers
+        self.name = f"{os.path.basename(path)}@{int(mtime)}"
+
+    @classmethod
+    def load(cls, path, count, num_threads=None, warmup_samples=8, warmup_folder="data/rep_windows", mtime=None):
+        """Build `count` interpreters for the model at `path` and warm each one up."""
+        mtime = os.path.getmtime(path) if mtime is None else mtime
+        with open(path, 'rb') as f:
+            content = f.read()
+        classifiers = [TFLiteClassifier(model_path=path, model_content=content, num_threads=num_threads) for _ in range(count)]
+        if warmup_samples:
+            windows = _warmup_windows(classifiers[0].input_shape, warmup_samples, folder=warmup_folder)
+            for clf in classifiers:
+                for win in windows:
+                    out = clf.predict(win)
+                    if not np.all(np.isfinite(out)):
+                        raise ValueError(f"Non-finite output from {path} during warm-up")
+        return cls(path, mtime, classifiers)
+
+
+class _Lane:
+    """A fixed set of worker threads, each bound to slot i of the active ModelVersion."""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.active = None
+        self._local = threading.local()
+        self._slots = itertools.count()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'tflite-{name}',
+                                           initializer=self._init_slot)
+
+    def _init_slot(self):
+        self._local.slot = next(self._slots)
+
+    def run(self, window):
+        # read the reference once: a concurrent swap does not affect this request
+        version = self.active
+        return version.classifiers[self._local.slot].predict(window), version
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class InterpreterPool:
+    def __init__(self, model_path, workers=2, num_threads=None, pattern='*.tflite', poll_interval=2.0,
+                 settle_seconds=1.0, warmup_samples=8, warmup_folder="data/rep_windows", shadow_workers=1,
+                 shadow_num_threads=1, shadow_max_pending=64):
+        """
+        model_path: a .tflite file or a directory watched for the newest file matching `pattern`
+        num_threads: TFLite threads per interpreter; defaults to cores / workers
+        settle_seconds: ignore files modified more recently than this (guards against half-written exports)
+        shadow_num_threads: TFLite threads per shadow interpreter, budgeted apart from the primary lane
+        shadow_max_pending: mirrored requests allowed in flight before new ones are skipped
+        """
+        self.model_path = model_path
+        self.workers = workers
+        self.num_threads = num_threads or max(1, (os.cpu_count() or 1) // workers)
+        self.pattern = pattern
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.warmup_samples = warmup_samples
+        self.warmup_folder = warmup_folder
+        self.shadow_workers = shadow_workers
+        self.shadow_num_threads = shadow_num_threads
+        self.shadow_max_pending = shadow_max_pending
+        self._shadow_pending = 0
+        self._lane = _Lane('primary', workers)
+        self._shadow = None
+        self._stats_lock = threading.Lock()
+        self._shadow_stats = {'compared': 0, 'agree': 0, 'skipped': 0, 'max_abs_diff': 0.0, 'sum_abs_diff': 0.0}
+        self._reload_lock = threading.Lock()
+        self._rejected = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+    @property
+    def version(self):
+        active = self._lane.active
+        return active.name if active else None
+
+    def check_for_update(self, force=False):
+        """Load and swap in a newer model if one is present. Returns True if the active version changed."""
+        with self._reload_lock:
+            path, mtime = _latest_model(self.model_path, self.pattern)
+            if path is None:
+                return False
+            active = self._lane.active
+            if not force and active is not None and (path, mtime) == (active.path, active.mtime):
+                return False
+            if active is not None and time.time() - mtime < self.settle_seconds:
+                return False
+            if not force and (path, mtime) == self._rejected:
+                # already failed to load; wait for a new export instead of retrying every poll
+                return False
+            try:
+                version = ModelVersion.load(path, self.workers, num_threads=self.num_threads,
+                                            warmup_samples=self.warmup_samples, warmup_folder=self.warmup_folder, mtime=mtime)
+            except Exception as e:
+                metrics.inc('model_reload_failures_total')
+                print("Failed to load model", path, ":", e)
+                self._rejected = (path, mtime)
+                if active is None:
+                    raise
+                return False
+            self._lane.active = version
+            metrics.inc('model_reloads_total')
+            print(f"Serving model {version.name}")
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                print("Model watcher error:", e)
+
+    def start(self, watch=True):
+        self.check_for_update(force=True)
+        if self._lane.active is None:
+            raise FileNotFoundError(f"No model matching {self.pattern} found at {self.model_path}")
+        if watch and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name='tflite-model-watcher', daemon=True)
+            self._watcher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+        self._lane.shutdown()
+        if self._shadow is not None:
+            self._shadow.shutdown()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    # shadow comparison
+    def set_shadow(self, path):
+        """Run `path` side by side with the primary model; pass None to stop shadowing."""
+        if path is None:
+            lane, self._shadow = self._shadow, None
+            if lane is not None:
+                lane.shutdown()
+            return
+        version = ModelVersion.load(path, self.shadow_workers, num_threads=self.shadow_num_threads,
+                                    warmup_samples=self.warmup_samples, warmup_folder=self.warmup_folder)
+        if self._shadow is None:
+            lane = _Lane('shadow', self.shadow_workers)
+            lane.active = version
+            self._shadow = lane
+        else:
+            self._shadow.active = version
+        with self._stats_lock:
+            self._shadow_stats = {'compared': 0, 'agree': 0, 'skipped': 0, 'max_abs_diff': 0.0, 'sum_abs_diff': 0.0}
+
+    def _compare(self, primary_probs, window):
+        shadow = self._shadow
+        if shadow is None:
+            return
+        with self._stats_lock:
+            if self._shadow_pending >= self.shadow_max_pending:
+                self._shadow_stats['skipped'] += 1
+                skip = True
+            else:
+                self._shadow_pending += 1
+                skip = False
+        if skip:
+            metrics.inc('shadow_skipped_total')
+            return
+
+        def done():
+            with self._stats_lock:
+                self._shadow_pending -= 1
+
+        def record(fut):
+            done()
+            try:
+                probs, _ = fut.result()
+            except Exception:
+                metrics.inc('shadow_failures_total')
+                return
+            diff = float(np.max(np.abs(probs - primary_probs)))
+            agree = int(np.argmax(probs) == np.argmax(primary_probs))
+            with self._stats_lock:
+                s = self._shadow_stats
+                s['compared'] += 1
+                s['agree'] += agree
+                s['sum_abs_diff'] += diff
+                s['max_abs_diff'] = max(s['max_abs_diff'], diff)
+            metrics.inc('shadow_compared_total')
+            metrics.inc('shadow_agree_total', agree)
+        try:
+            shadow.executor.submit(shadow.run, window).add_done_callback(record)
+        except RuntimeError:
+            # shadow lane shut down concurrently
+            done()
+
+    def shadow_report(self):
+        with self._stats_lock:
+            s = dict(self._shadow_stats)
+        n = s['compared']
+        return {
+            'primary': self.version,
+            'shadow': self._shadow.active.name if self._shadow else None,
+            'compared': n,
+            'skipped': s['skipped'],
+            'agreement': s['agree'] / n if n else None,
+            'mean_abs_diff': s['sum_abs_diff'] / n if n else None,
+            'max_abs_diff': s['max_abs_diff'],
+        }
+
+    # serving
+    def _serve(self, window):
+        probs, _ = self._lane.run(window)
+        if self._shadow is not None:
+            self._compare(probs, window)
+        return probs
+
+    def submit(self, window):
+        """Queue one (seq_len, features) window; returns a Future of class probabilities."""
+        return self._lane.executor.submit(self._serve, window)
+
+    def predict(self, window):
+        return self.submit(window).result()
+
+    def predict_many(self, windows):
+        return [f.result() for f in [self.submit(w) for w in windows]]
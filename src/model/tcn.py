@@ -64,3 +64,36 @@ def build_tcn(input_shape=(100, 10),
 
     model = models.Model(inputs=inp, outputs=out, name='CitySafeSense_TCN')
     return model
+
+def separable_block(x, filters, kernel_size, dilation_rate, name=None):
+    """Causal depthwise-separable residual block: left zero-pad, depthwise conv, 1x1 pointwise conv."""
+    pad = layers.ZeroPadding1D(padding=((kernel_size - 1) * dilation_rate, 0),
+                               name=None if name is None else name + "_pad")(x)
+    conv = layers.DepthwiseConv1D(kernel_size=kernel_size, dilation_rate=dilation_rate, padding='valid', use_bias=False,
+                                  name=None if name is None else name + "_dw")(pad)
+    conv = layers.Conv1D(filters=filters, kernel_size=1, use_bias=False,
+                         name=None if name is None else name + "_pw")(conv)
+    conv = layers.BatchNormalization(name=None if name is None else name + "_bn")(conv)
+    conv = layers.ReLU(name=None if name is None else name + "_act")(conv)
+    return layers.Add(name=None if name is None else name + "_add")([x, conv])
+
+def build_tiny_tcn(input_shape=(100, 10),
+                   num_classes=3,
+                   num_filters=12,
+                   kernel_size=3,
+                   dilation_base=2,
+                   num_blocks=4):
+    """
+    Student model for MCU-class targets (see src.train.distill): a single dilation stack of
+    depthwise-separable blocks at constant width and no dense hidden layer.
+    With the defaults the receptive field is 31 steps (build_tcn: 29) at ~1k parameters.
+    The pre-softmax Dense layer is named 'logits' so distillation can train on temperature-scaled logits.
+    """
+    inp = layers.Input(shape=input_shape, name='input')
+    x = layers.Conv1D(filters=num_filters, kernel_size=1, name='proj_conv')(inp)
+    for b in range(num_blocks):
+        x = separable_block(x, filters=num_filters, kernel_size=kernel_size, dilation_rate=dilation_base ** b, name=f"block{b}")
+    x = layers.GlobalAveragePooling1D(name='gap')(x)
+    x = layers.Dense(num_classes, name='logits')(x)
+    out = layers.Activation('softmax', name='output')(x)
+    return models.Model(inputs=inp, outputs=out, name='CitySafeSense_TinyTCN')
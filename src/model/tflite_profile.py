@@ -0,0 +1,169 @@
+"""
+Per-op memory and latency report for a .tflite model, checked against an MCU budget.
+
+- flash: size of the flatbuffer (weights + graph)
+- arena: activation memory. Every non-constant tensor gets a buffer that lives from its producing op to its
+  last consumer (RESHAPE/EXPAND_DIMS/SQUEEZE outputs alias their input, as in the TFLite Micro planner).
+  The peak of the live bytes over all ops is a lower bound of the tensor arena; TFLite Micro's greedy
+  planner normally lands at or slightly above it, plus a few KB of interpreter bookkeeping.
+- latency: whole-model invoke time is measured with a single thread and no XNNPACK delegate (optionally
+  with the reference kernels). The Python interpreter cannot time single ops, so the per-op column spreads
+  the measured median over ops in proportion to MACs + activation elements touched (an estimate).
+
+Usage:
+    python -m src.model.tflite_profile --model checkpoints/student/student_int8.tflite --arena_kb 64 --flash_kb 128 --latency_ms 10
+"""
+import json
+import time
+import argparse
+import numpy as np
+
+ALIAS_OPS = {'RESHAPE', 'EXPAND_DIMS', 'SQUEEZE'}
+
+
+def _load_interpreter(model_content, reference_kernels=False):
+    try:
+        from tflite_runtime.interpreter import Interpreter, OpResolverType
+    except ImportError:
+        import tensorflow as tf
+        Interpreter, OpResolverType = tf.lite.Interpreter, tf.lite.experimental.OpResolverType
+    resolver = OpResolverType.BUILTIN_REF if reference_kernels else OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+    interpreter = Interpreter(model_content=model_content, num_threads=1, experimental_op_resolver_type=resolver)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+def _nbytes(tensor):
+    return int(np.prod(tensor['shape'])) * np.dtype(tensor['dtype']).itemsize
+
+
+def _macs(op_name, output, weights):
+    out_elems = int(np.prod(output['shape']))
+    if weights is None:
+        return 0
+    w = weights['shape']
+    if op_name == 'CONV_2D':
+        return out_elems * int(np.prod(w[1:]))
+    if op_name == 'DEPTHWISE_CONV_2D':
+        return out_elems * int(w[1] * w[2])
+    if op_name == 'FULLY_CONNECTED':
+        return out_elems * int(w[-1])
+    return 0
+
+
+def _measure(interpreter, runs, warmup, seed):
+    inp = interpreter.get_input_details()[0]
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal(inp['shape']).astype('float32')
+    if inp['dtype'] in (np.int8, np.uint8):
+        scale, zero_point = inp['quantization']
+        info = np.iinfo(inp['dtype'])
+        x = np.clip(np.round(x / scale + zero_point), info.min, info.max)
+    interpreter.set_tensor(inp['index'], x.astype(inp['dtype']))
+    for _ in range(warmup):
+        interpreter.invoke()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        interpreter.invoke()
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1e3
+
+
+def profile_tflite(model_path=None, model_content=None, runs=100, warmup=10, reference_kernels=False, seed=0):
+    """Return {'model_bytes', 'arena_bytes', 'latency_ms', 'latency_p90_ms', 'kernels', 'ops': [...]}."""
+    if model_content is None:
+        with open(model_path, 'rb') as f:
+            model_content = f.read()
+    interpreter = _load_interpreter(model_content, reference_kernels=reference_kernels)
+    tensors = {t['index']: t for t in interpreter.get_tensor_details()}
+    ops = [op for op in interpreter._get_ops_details() if op['op_name'] != 'DELEGATE']
+    graph_inputs = [d['index'] for d in interpreter.get_input_details()]
+    graph_outputs = [d['index'] for d in interpreter.get_output_details()]
+    produced = {int(t) for op in ops for t in op['outputs']}
+    activations = produced | set(graph_inputs)
+
+    # buffer lifetimes, with alias ops sharing their input's buffer
+    root = {t: t for t in activations}
+    first, last, size = {}, {}, {}
+    for t in graph_inputs:
+        first[t] = 0
+    for i, op in enumerate(ops):
+        ins = [int(t) for t in op['inputs'] if int(t) in activations]
+        for t in ins:
+            last[root[t]] = i
+        for t in (int(t) for t in op['outputs']):
+            if op['op_name'] in ALIAS_OPS and ins:
+                root[t] = root[ins[0]]
+            first.setdefault(root[t], i)
+            last[root[t]] = max(last.get(root[t], i), i)
+    for t in graph_outputs:
+        last[root[t]] = len(ops) - 1
+    for t in activations:
+        size[root[t]] = max(size.get(root[t], 0), _nbytes(tensors[t]))
+
+    latencies = _measure(interpreter, runs, warmup, seed)
+    median = float(np.median(latencies))
+    rows = []
+    for i, op in enumerate(ops):
+        out = tensors[int(op['outputs'][0])]
+        consts = [tensors[int(t)] for t in op['inputs'] if int(t) >= 0 and int(t) not in activations]
+        weights = next((w for w in consts if len(w['shape']) >= 2), None)
+        macs = _macs(op['op_name'], out, weights)
+        touched = 0 if op['op_name'] in ALIAS_OPS else \
+            sum(int(np.prod(tensors[int(t)]['shape'])) for t in list(op['inputs']) + list(op['outputs']) if int(t) in activations)
+        live = sum(size[b] for b in size if first.get(b, 0) <= i <= last.get(b, -1))
+        rows.append({'index': i, 'op': op['op_name'], 'output': out['name'], 'output_shape': [int(d) for d in out['shape']],
+                     'macs': macs, 'cost': macs + touched, 'live_bytes': int(live),
+                     'weight_bytes': int(sum(_nbytes(w) for w in consts))})
+    total_cost = sum(r['cost'] for r in rows) or 1
+    for r in rows:
+        r['latency_ms_est'] = median * r.pop('cost') / total_cost
+    return {'model_bytes': len(model_content), 'arena_bytes': max((r['live_bytes'] for r in rows), default=0),
+            'latency_ms': median, 'latency_p90_ms': float(np.percentile(latencies, 90)),
+            'kernels': 'reference' if reference_kernels else 'builtin', 'macs': int(sum(r['macs'] for r in rows)),
+            'ops': rows}
+
+
+def check_budget(report, arena_kb=None, flash_kb=None, latency_ms=None):
+    """Return a list of budget violations (empty when the model fits)."""
+    violations = []
+    if arena_kb is not None and report['arena_bytes'] > arena_kb * 1024:
+        violations.append(f"arena {report['arena_bytes'] / 1024:.1f} KB > {arena_kb} KB")
+    if flash_kb is not None and report['model_bytes'] > flash_kb * 1024:
+        violations.append(f"flash {report['model_bytes'] / 1024:.1f} KB > {flash_kb} KB")
+    if latency_ms is not None and report['latency_ms'] > latency_ms:
+        violations.append(f"latency {report['latency_ms']:.3f} ms > {latency_ms} ms")
+    return violations
+
+
+def format_report(report):
+    lines = [f"{'#':>3}  {'op':<20} {'output shape':<18} {'MACs':>10} {'live KB':>8} {'weights B':>9} {'est ms':>8}"]
+    for r in report['ops']:
+        lines.append(f"{r['index']:>3}  {r['op']:<20} {str(r['output_shape']):<18} {r['macs']:>10} "
+                     f"{r['live_bytes'] / 1024:>8.2f} {r['weight_bytes']:>9} {r['latency_ms_est']:>8.4f}")
+    lines.append(f"flash {report['model_bytes'] / 1024:.1f} KB, arena (peak live) {report['arena_bytes'] / 1024:.1f} KB, "
+                 f"{report['macs']} MACs, latency median {report['latency_ms']:.3f} ms / p90 {report['latency_p90_ms']:.3f} ms "
+                 f"({report['kernels']} kernels, 1 thread)")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', required=True)
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--reference', action='store_true', help='Time with the reference kernels (closer to plain TFLite Micro)')
+    parser.add_argument('--arena_kb', type=float, default=None)
+    parser.add_argument('--flash_kb', type=float, default=None)
+    parser.add_argument('--latency_ms', type=float, default=None)
+    parser.add_argument('--json', default=None, help='Also write the report as JSON')
+    args = parser.parse_args()
+    rep = profile_tflite(args.model, runs=args.runs, reference_kernels=args.reference)
+    print(format_report(rep))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rep, f, indent=2)
+    problems = check_budget(rep, arena_kb=args.arena_kb, flash_kb=args.flash_kb, latency_ms=args.latency_ms)
+    for p in problems:
+        print("Over budget:", p)
+    raise SystemExit(1 if problems else 0)
@@ -0,0 +1,68 @@
+"""
+Minimal TFLite inference wrapper for exported CitySafeSense models.
+
+Prefers the lightweight `tflite_runtime` package (as installed on the Pi) and falls back to
+`tf.lite.Interpreter` when only full TensorFlow is available. Handles int8/uint8 quantized
+inputs and outputs so callers always pass and receive float32.
+
+Usage:
+    from src.model.tflite_runner import TFLiteClassifier
+    clf = TFLiteClassifier('checkpoints/model.tflite', num_threads=2)
+    probs = clf.predict(window)   # window: (seq_len, features) or (1, seq_len, features)
+"""
+import numpy as np
+from src.monitoring import metrics
+
+
+def _interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+def load_interpreter(model_path=None, model_content=None, num_threads=None):
+    Interpreter = _interpreter_class()
+    if model_content is not None:
+        interpreter = Interpreter(model_content=model_content, num_threads=num_threads)
+    else:
+        interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+class TFLiteClassifier:
+    def __init__(self, model_path=None, model_content=None, num_threads=None):
+        self.model_path = model_path
+        self.interpreter = load_interpreter(model_path=model_path, model_content=model_content, num_threads=num_threads)
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.input_shape = tuple(self.input_details['shape'])
+
+    def _quantize_input(self, x):
+        dtype = self.input_details['dtype']
+        if dtype in (np.int8, np.uint8):
+            scale, zero_point = self.input_details['quantization']
+            info = np.iinfo(dtype)
+            x = np.clip(np.round(x / scale + zero_point), info.min, info.max)
+        return x.astype(dtype)
+
+    def _dequantize_output(self, y):
+        if self.output_details['dtype'] in (np.int8, np.uint8):
+            scale, zero_point = self.output_details['quantization']
+            return (y.astype('float32') - zero_point) * scale
+        return y.astype('float32')
+
+    def predict(self, window):
+        """Run a single window through the interpreter and return class probabilities (float32)."""
+        x = np.asarray(window, dtype='float32')
+        if x.ndim == 2:
+            x = x[np.newaxis]
+        self.interpreter.set_tensor(self.input_details['index'], self._quantize_input(x))
+        with metrics.timer('tflite_invoke_seconds'):
+            self.interpreter.invoke()
+        metrics.inc('inferences_total')
+        y = self.interpreter.get_tensor(self.output_details['index'])
+        return self._dequantize_output(y)[0]
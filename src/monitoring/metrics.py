@@ -0,0 +1,298 @@
+"""
+Lightweight instrumentation for the CitySafeSense hot paths (ingest, preprocessing, inference).
+
+Provides counters, gauges and histograms plus a timer usable as a context manager or decorator.
+Metrics are exported in the Prometheus text exposition format, either over a local HTTP
+endpoint (long-running services) or written to a file (batch jobs, e.g. node_exporter textfile collector).
+
+Instrumentation is disabled by default so it adds near-zero overhead: `timer()` returns a shared
+no-op context manager and `timed` functions only check a flag before calling through.
+Enable it with the CITYSAFESENSE_METRICS=1 environment variable or `enable()`.
+
+Usage:
+    from src.monitoring import metrics
+    metrics.enable()
+    with metrics.timer('preprocess_window_seconds'):
+        ...
+    metrics.inc('windows_total', 3)
+    metrics.start_http_server(port=9108)      # serves /metrics
+    metrics.write_metrics_file('run.prom')    # or dump once at the end of a batch job
+"""
+import os
+import time
+import threading
+import functools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# seconds; tuned for per-window preprocessing / TFLite invoke on a Pi (sub-ms up to a few seconds)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PREFIX = 'citysafesense_'
+
+
+def _label_key(labels):
+    if not labels:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key)
+    if extra:
+        items.append(extra)
+    if not items:
+        return ''
+    body = ','.join('{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"')) for k, v in items)
+    return '{' + body + '}'
+
+
+def _format_value(v):
+    if v == float('inf'):
+        return '+Inf'
+    return repr(float(v))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text=''):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, labels=None):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, labels=None):
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, None, v) for key, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, labels=None):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text='', buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # per label set: [bucket counts..., sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=None):
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, labels=None):
+        state = self._values.get(_label_key(labels))
+        return state[-1] if state else 0
+
+    def sum(self, labels=None):
+        state = self._values.get(_label_key(labels))
+        return state[-2] if state else 0.0
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for i, upper in enumerate(self.buckets):
+                    cumulative += state[i]
+                    out.append((self.name + '_bucket', key, ('le', _format_value(upper)), cumulative))
+                out.append((self.name + '_sum', key, None, state[-2]))
+                out.append((self.name + '_count', key, None, state[-1]))
+        return out
+
+
+class _NullTimer:
+    """Shared no-op context manager returned by `timer()` while metrics are disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('_hist', '_labels', '_start', 'elapsed')
+
+    def __init__(self, hist, labels):
+        self._hist = hist
+        self._labels = labels
+        self.elapsed = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self._start
+        self._hist.observe(self.elapsed, self._labels)
+        return False
+
+
+class Registry:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text='', **kwargs):
+        full = name if name.startswith(PREFIX) else PREFIX + name
+        metric = self._metrics.get(full)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(full)
+                if metric is None:
+                    metric = self._metrics[full] = cls(full, help_text, **kwargs)
+        if not isinstance(metric, cls):
+            raise ValueError(f"Metric {full} already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, help_text=''):
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name, help_text=''):
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def reset(self):
+        with self._lock:
+            self._metrics = {}
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample_name, key, extra, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(key, extra)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry(enabled=os.environ.get('CITYSAFESENSE_METRICS', '').lower() in ('1', 'true', 'yes', 'on'))
+
+
+def enable():
+    REGISTRY.enabled = True
+
+
+def disable():
+    REGISTRY.enabled = False
+
+
+def is_enabled():
+    return REGISTRY.enabled
+
+
+def inc(name, amount=1.0, labels=None):
+    if REGISTRY.enabled:
+        REGISTRY.counter(name).inc(amount, labels)
+
+
+def set_gauge(name, value, labels=None):
+    if REGISTRY.enabled:
+        REGISTRY.gauge(name).set(value, labels)
+
+
+def observe(name, value, labels=None):
+    if REGISTRY.enabled:
+        REGISTRY.histogram(name).observe(value, labels)
+
+
+def timer(name, labels=None):
+    """Context manager timing the enclosed block into histogram `name` (seconds)."""
+    if not REGISTRY.enabled:
+        return _NULL_TIMER
+    return _Timer(REGISTRY.histogram(name), labels)
+
+
+def timed(name, labels=None):
+    """Decorator timing every call of the wrapped function into histogram `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return fn(*args, **kwargs)
+            with _Timer(REGISTRY.histogram(name), labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_prometheus():
+    return REGISTRY.render()
+
+
+def write_metrics_file(path):
+    """Write the current metrics to `path` atomically (safe for textfile collectors)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # keep scrapes out of the service logs
+        pass
+
+
+def start_http_server(port=9108, addr='127.0.0.1'):
+    """
+    Serve /metrics on a daemon thread and enable collection. Binds to localhost by default;
+    returns the server so callers can `shutdown()` it.
+    """
+    enable()
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    print(f"Serving metrics on http://{addr}:{server.server_address[1]}/metrics")
+    return server
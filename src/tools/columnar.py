@@ -0,0 +1,202 @@
+"""
+Compact columnar on-disk format for raw sensor recordings, as an alternative to CSV.
+
+A recording is a directory `<name>.cols/` holding:
+- meta.json          {"format": "citysafesense-columnar", "version": 1, "rows": N, "time_column": ..., "columns": [...],
+                      "layout": "npy" | "blocks", "block_rows": ..., "time_unit": "ns" | null}
+- layout "npy":      one `c<i>.npy` per column, in meta["columns"] order (channels float32), read back through
+                     memory-mapped views
+- layout "blocks":   blocks/000000.npz ... each a zlib-compressed chunk of `block_rows` rows for all columns;
+                     a datetime time column is delta-encoded within each block (regular sampling compresses to almost nothing)
+
+Time columns holding date strings or datetimes are stored as int64 ns since epoch (time_unit "ns"): naive values
+are kept as-is, tz-aware values are converted to UTC and stored naive. Numeric time columns (e.g. float epoch
+seconds from mqtt_publisher) are stored unchanged in their original dtype (time_unit null) and read back as numbers.
+Non-numeric channel columns are dropped on conversion.
+csv_to_windows reads `.cols` recordings transparently.
+
+Usage:
+    python -m src.tools.columnar --input_dir raw_csvs --out_dir raw_cols [--compress] [--report]
+"""
+import os
+import json
+import time
+import argparse
+from glob import glob
+import numpy as np
+import pandas as pd
+
+FORMAT_NAME = 'citysafesense-columnar'
+SUFFIX = '.cols'
+TIME_CANDIDATES = ['timestamp', 'ts', 'time', 'datetime', 'date', 't']
+
+
+def is_columnar(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, 'meta.json'))
+
+
+def _time_column(df):
+    for c in TIME_CANDIDATES:
+        if c in df.columns:
+            return c
+    return None
+
+
+def _to_epoch_ns(series):
+    ts = pd.to_datetime(series, errors='coerce')
+    if getattr(ts.dt, 'tz', None) is not None:
+        ts = ts.dt.tz_convert('UTC').dt.tz_localize(None)
+    # NaT -> int64 min, kept as the missing-value marker
+    return ts.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+
+def write_columnar(df, out_path, compress=False, block_rows=65536):
+    """Write a DataFrame as a columnar recording. Returns the meta dict."""
+    time_col = _time_column(df)
+    columns = {}
+    time_unit = None
+    if time_col is not None:
+        if pd.api.types.is_numeric_dtype(df[time_col]):
+            # the unit of a bare number is unknown here, so it is not reinterpreted
+            columns[time_col] = df[time_col].to_numpy()
+        else:
+            columns[time_col] = _to_epoch_ns(df[time_col])
+            time_unit = 'ns'
+    dropped = []
+    for c in df.columns:
+        if c == time_col:
+            continue
+        if pd.api.types.is_numeric_dtype(df[c]):
+            columns[c] = df[c].to_numpy(dtype='float32')
+        else:
+            dropped.append(c)
+    os.makedirs(out_path, exist_ok=True)
+    rows = len(df)
+    meta = {'format': FORMAT_NAME, 'version': 1, 'rows': rows, 'time_column': time_col, 'columns': list(columns),
+            'dtypes': {c: str(a.dtype) for c, a in columns.items()}, 'layout': 'blocks' if compress else 'npy',
+            'block_rows': block_rows if compress else None, 'time_unit': time_unit,
+            'time_encoding': 'delta' if compress and time_unit == 'ns' else None, 'dropped_columns': dropped}
+    if compress:
+        block_dir = os.path.join(out_path, 'blocks')
+        os.makedirs(block_dir, exist_ok=True)
+        for b, start in enumerate(range(0, max(rows, 1), block_rows)):
+            block = {f'c{i}': a[start:start + block_rows] for i, a in enumerate(columns.values())}
+            if meta['time_encoding'] == 'delta':
+                # int64 arithmetic wraps consistently, so NaT markers survive the diff/cumsum round trip
+                block['c0'] = np.diff(block['c0'], prepend=np.int64(0))
+            np.savez_compressed(os.path.join(block_dir, f'{b:06d}.npz'), **block)
+    else:
+        for i, (c, a) in enumerate(columns.items()):
+            np.save(os.path.join(out_path, f'c{i}.npy'), a)
+    # meta.json last: its presence marks a complete recording
+    with open(os.path.join(out_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def csv_to_columnar(csv_path, out_path=None, compress=False, block_rows=65536):
+    out_path = out_path or os.path.splitext(csv_path)[0] + SUFFIX
+    return write_columnar(pd.read_csv(csv_path), out_path, compress=compress, block_rows=block_rows)
+
+
+def read_meta(path):
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('format') != FORMAT_NAME:
+        raise ValueError(f"{path} is not a {FORMAT_NAME} recording")
+    return meta
+
+
+def read_arrays(path, columns=None, mmap=True):
+    """Return {column: ndarray}; for the npy layout the arrays are read-only memory-mapped views."""
+    meta = read_meta(path)
+    wanted = meta['columns'] if columns is None else [c for c in meta['columns'] if c in columns or c == meta['time_column']]
+    positions = {c: i for i, c in enumerate(meta['columns'])}
+    if meta['layout'] == 'npy':
+        return {c: np.load(os.path.join(path, f'c{positions[c]}.npy'), mmap_mode='r' if mmap else None) for c in wanted}
+    blocks = sorted(glob(os.path.join(path, 'blocks', '*.npz')))
+    parts = {c: [] for c in wanted}
+    for fn in blocks:
+        with np.load(fn) as z:
+            for c in wanted:
+                a = z[f'c{positions[c]}']
+                parts[c].append(np.cumsum(a, dtype=np.int64) if c == meta['time_column'] and meta.get('time_encoding') == 'delta' else a)
+    return {c: np.concatenate(p) if p else np.empty(0, dtype=meta['dtypes'][c]) for c, p in parts.items()}
+
+
+def read_columnar(path, columns=None):
+    """
+    Read a recording as a DataFrame shaped like pd.read_csv output (time column as datetime64[ns], or numeric when the
+    source time column was numeric).
+    """
+    meta = read_meta(path)
+    arrays = read_arrays(path, columns=columns)
+    # recordings written before time_unit was recorded always stored int64 ns
+    time_col = meta['time_column'] if meta.get('time_unit', 'ns') == 'ns' else None
+    data = {}
+    for c, a in arrays.items():
+        data[c] = np.asarray(a).view('datetime64[ns]') if c == time_col else np.asarray(a)
+    return pd.DataFrame(data, copy=False)
+
+
+def _dir_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def report(csv_path, cols_path, repeats=3):
+    """Parse-time and storage comparison between a CSV and its columnar copy."""
+    def best(fn):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+    def parse_csv():
+        df = pd.read_csv(csv_path)
+        time_col = _time_column(df)
+        if time_col is not None:
+            pd.to_datetime(df[time_col], errors='coerce')
+    csv_time = best(parse_csv)
+    col_time = best(lambda: read_columnar(cols_path))
+    csv_size, col_size = _dir_size(csv_path), _dir_size(cols_path)
+    return {'csv_bytes': csv_size, 'columnar_bytes': col_size, 'size_ratio': csv_size / max(col_size, 1),
+            'csv_parse_s': csv_time, 'columnar_read_s': col_time, 'speedup': csv_time / max(col_time, 1e-9)}
+
+
+def main(input_dir='raw_csvs', out_dir=None, compress=False, block_rows=65536, show_report=False):
+    out_dir = out_dir or input_dir
+    os.makedirs(out_dir, exist_ok=True)
+    csvs = sorted(glob(os.path.join(input_dir, '*.csv')))
+    if not csvs:
+        print("No CSV files found in", input_dir)
+        return []
+    results = []
+    for csv in csvs:
+        out = os.path.join(out_dir, os.path.splitext(os.path.basename(csv))[0] + SUFFIX)
+        meta = csv_to_columnar(csv, out, compress=compress, block_rows=block_rows)
+        line = f"{csv} -> {out} ({meta['rows']} rows, {len(meta['columns'])} columns)"
+        if meta['dropped_columns']:
+            line += f", dropped non-numeric: {', '.join(meta['dropped_columns'])}"
+        print(line)
+        entry = {'csv': csv, 'columnar': out}
+        if show_report:
+            entry.update(report(csv, out))
+            print(f"  size {entry['csv_bytes'] / 1e6:.2f} MB -> {entry['columnar_bytes'] / 1e6:.2f} MB "
+                  f"(x{entry['size_ratio']:.1f} smaller), parse {entry['csv_parse_s'] * 1e3:.1f} ms -> "
+                  f"{entry['columnar_read_s'] * 1e3:.1f} ms (x{entry['speedup']:.1f} faster)")
+        results.append(entry)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input_dir', default='raw_csvs')
+    parser.add_argument('--out_dir', default=None, help='Defaults to input_dir (writes <name>.cols next to each CSV)')
+    parser.add_argument('--compress', action='store_true', help='Write zlib-compressed row blocks instead of mmap-able .npy columns')
+    parser.add_argument('--block_rows', type=int, default=65536)
+    parser.add_argument('--report', action='store_true', help='Print storage and parse-time comparison per file')
+    args = parser.parse_args()
+    main(input_dir=args.input_dir, out_dir=args.out_dir, compress=args.compress, block_rows=args.block_rows, show_report=args.report)
@@ -1,10 +1,14 @@
 """
 Convert raw sensor CSV recordings into sliding window .npy files and aggregate sample file.
+Columnar recordings (<name>.cols directories written by src.tools.columnar) are read the same way, without CSV parsing;
+when both <name>.csv and <name>.cols exist the columnar copy is used.
 
 Enhancements:
 - Detects timestamp column (names: timestamp, ts, time, datetime) and resamples to a fixed sampling rate (--target_hz).
 - If timestamp present, rows will be resampled using linear interpolation to uniform sampling.
 - If no timestamp, assumes rows are uniformly sampled.
+- Writes a stacked window store (windows.npy, shape (N, seq_len, features)) next to metadata.json; each metadata
+  entry records its row in the store ("index") and, when a label mapping is given, the recording's "label".
 """
 import os
 import argparse
@@ -12,6 +16,8 @@ import numpy as np
 import pandas as pd
 import json
 from glob import glob
+from src.monitoring import metrics
+from src.tools import columnar
 
 def ensure_dir(d):
     os.makedirs(d, exist_ok=True)
@@ -23,6 +29,7 @@ def _detect_time_column(df):
             return c
     return None
 
+@metrics.timed('resample_seconds')
 def _resample_dataframe(df, time_col, target_hz):
     # convert to datetime
     df = df.copy()
@@ -31,7 +38,7 @@ def _resample_dataframe(df, time_col, target_hz):
     df = df.set_index(time_col)
     # desired period string in milliseconds
     period_ms = int(round(1000.0 / float(target_hz)))
-    rule = f"{period_ms}L"  # L = milliseconds
+    rule = f"{period_ms}ms"
     # reindex to uniform timestamps covering the original span
     start = df.index.min()
     end = df.index.max()
@@ -41,8 +48,15 @@ def _resample_dataframe(df, time_col, target_hz):
     df = df.interpolate(method='time').reindex(new_index)
     return df
 
-def process_file(path, columns, seq_len=100, stride=50, out_folder="data/rep_windows", source_tag=None, target_hz=None):
-    df = pd.read_csv(path)
+@metrics.timed('process_file_seconds')
+def process_file(path, columns, seq_len=100, stride=50, out_folder="data/rep_windows", source_tag=None, target_hz=None, label=None):
+    if columnar.is_columnar(path):
+        with metrics.timer('columnar_read_seconds'):
+            # only the requested channels (plus the time column) are mapped in
+            df = columnar.read_columnar(path, columns=columns)
+    else:
+        with metrics.timer('csv_read_seconds'):
+            df = pd.read_csv(path)
     # detect timestamp and resample if requested
     time_col = _detect_time_column(df)
     if time_col and target_hz:
@@ -60,55 +74,104 @@ def process_file(path, columns, seq_len=100, stride=50, out_folder="data/rep_win
     windows = []
     metadata = []
     idx = 0
-    for start in range(0, max(1, T - seq_len + 1), stride):
-        win = data[start:start+seq_len]
-        if win.shape[0] < seq_len:
-            # pad
-            pad_len = seq_len - win.shape[0]
-            win = np.vstack([win, np.zeros((pad_len, F), dtype='float32')])
-        # simple normalization per-window
-        mean = np.mean(win, axis=0, keepdims=True)
-        std = np.std(win, axis=0, keepdims=True) + 1e-6
-        win = (win - mean) / std
-        fname = f"{source_tag or os.path.splitext(os.path.basename(path))[0]}_{idx}.npy"
-        out_path = os.path.join(out_folder, fname)
-        np.save(out_path, win)
-        windows.append(win)
-        metadata.append({"file": fname, "source": path, "start_row": int(start), "end_row": int(start+seq_len)})
-        idx += 1
+    with metrics.timer('windowing_seconds'):
+        for start in range(0, max(1, T - seq_len + 1), stride):
+            win = data[start:start+seq_len]
+            if win.shape[0] < seq_len:
+                # pad
+                pad_len = seq_len - win.shape[0]
+                win = np.vstack([win, np.zeros((pad_len, F), dtype='float32')])
+            # simple normalization per-window
+            with metrics.timer('normalize_seconds'):
+                mean = np.mean(win, axis=0, keepdims=True)
+                std = np.std(win, axis=0, keepdims=True) + 1e-6
+                win = (win - mean) / std
+            fname = f"{source_tag or os.path.splitext(os.path.basename(path))[0]}_{idx}.npy"
+            out_path = os.path.join(out_folder, fname)
+            np.save(out_path, win)
+            windows.append(win)
+            entry = {"file": fname, "source": path, "start_row": int(start), "end_row": int(start+seq_len)}
+            if label is not None:
+                entry["label"] = label
+            metadata.append(entry)
+            idx += 1
+    metrics.inc('windows_total', idx)
+    metrics.inc('rows_total', T)
     return windows, metadata
 
 def aggregate_windows_to_sample(windows, out_path="data/sample.npy"):
     # concatenate windows along time dimension to create a long T x F array for fallback
     if not windows:
-        return
+        return None
+    widths = {w.shape[1] for w in windows}
+    if len(widths) != 1:
+        print("Skipping aggregated sample: windows have differing channel counts", sorted(widths))
+        return None
     arrs = [w for w in windows]
     concat = np.vstack(arrs)
     np.save(out_path, concat)
+    return out_path
 
-def main(input_dir="raw_csvs", out_dir="data", seq_len=100, stride=50, feature_list=None, target_hz=None):
-    ensure_dir(out_dir)
-    rep_folder = os.path.join(out_dir, "rep_windows")
-    ensure_dir(rep_folder)
-    metadata_all = []
-    windows_all = []
-    csvs = glob(os.path.join(input_dir, "*.csv"))
-    if not csvs:
-        print("No CSV files found in", input_dir)
-        return
-    for csv in csvs:
-        try:
-            wins, meta = process_file(csv, feature_list, seq_len=seq_len, stride=stride, out_folder=rep_folder, source_tag=os.path.splitext(os.path.basename(csv))[0], target_hz=target_hz)
-            windows_all.extend(wins)
-            metadata_all.extend(meta)
-        except Exception as e:
-            print("Failed to process", csv, e)
-    # save aggregated sample for fallback
-    aggregate_windows_to_sample(windows_all, out_path=os.path.join(out_dir, "sample.npy"))
-    # save metadata
-    with open(os.path.join(out_dir, "metadata.json"), "w") as f:
-        json.dump(metadata_all, f, indent=2)
-    print(f"Saved {len(windows_all)} windows to {rep_folder} and aggregated sample to {os.path.join(out_dir,'sample.npy')}")
+def save_window_store(windows, out_path="data/windows.npy"):
+    # stack windows into a single (N, seq_len, F) array that can be memory-mapped by the representative sampler
+    if not windows:
+        return None
+    shapes = {w.shape for w in windows}
+    if len(shapes) != 1:
+        print("Skipping window store: windows have differing shapes", sorted(shapes))
+        return None
+    np.save(out_path, np.stack(windows).astype('float32'))
+    return out_path
+
+def main(input_dir="raw_csvs", out_dir="data", seq_len=100, stride=50, feature_list=None, target_hz=None, metrics_out=None, labels=None):
+    """
+    labels: optional dict mapping a recording's source tag (CSV/.cols basename without extension) to its class label.
+    """
+    was_enabled = metrics.is_enabled()
+    if metrics_out:
+        metrics.enable()
+    try:
+        ensure_dir(out_dir)
+        rep_folder = os.path.join(out_dir, "rep_windows")
+        ensure_dir(rep_folder)
+        metadata_all = []
+        windows_all = []
+        recordings = {}
+        for rec in sorted(glob(os.path.join(input_dir, "*.csv"))) + sorted(glob(os.path.join(input_dir, "*" + columnar.SUFFIX))):
+            if rec.endswith(".csv") or columnar.is_columnar(rec):
+                # later (columnar) entries replace the CSV with the same basename
+                recordings[os.path.splitext(os.path.basename(rec))[0]] = rec
+        if not recordings:
+            print("No CSV or columnar recordings found in", input_dir)
+            return
+        for tag, path in recordings.items():
+            try:
+                wins, meta = process_file(path, feature_list, seq_len=seq_len, stride=stride, out_folder=rep_folder, source_tag=tag, target_hz=target_hz, label=(labels or {}).get(tag))
+                windows_all.extend(wins)
+                metadata_all.extend(meta)
+            except Exception as e:
+                metrics.inc('files_failed_total')
+                print("Failed to process", path, e)
+        # save aggregated sample for fallback
+        aggregate_windows_to_sample(windows_all, out_path=os.path.join(out_dir, "sample.npy"))
+        store_path = os.path.join(out_dir, "windows.npy")
+        if save_window_store(windows_all, out_path=store_path):
+            for i, entry in enumerate(metadata_all):
+                entry["index"] = i
+        elif os.path.exists(store_path):
+            # a store from an earlier run no longer matches metadata.json
+            os.remove(store_path)
+        # save metadata
+        with open(os.path.join(out_dir, "metadata.json"), "w") as f:
+            json.dump(metadata_all, f, indent=2)
+        print(f"Saved {len(windows_all)} windows to {rep_folder} and aggregated sample to {os.path.join(out_dir,'sample.npy')}")
+        if metrics_out:
+            metrics.write_metrics_file(metrics_out)
+            print("Wrote metrics to", metrics_out)
+    finally:
+        # library callers (tests, benchmarks) must not be left with the global registry switched on
+        if not was_enabled:
+            metrics.disable()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -118,6 +181,12 @@ if __name__ == "__main__":
     parser.add_argument('--stride', type=int, default=50)
     parser.add_argument('--features', type=str, default=None, help='Comma-separated feature columns to use, e.g. ax,ay,az,gx,gy,gz,speed')
     parser.add_argument('--target_hz', type=float, default=None, help='Target sampling rate in Hz (e.g. 50). If provided and a timestamp column exists, data will be resampled.')
+    parser.add_argument('--metrics_out', default=None, help='Write Prometheus-format timing metrics to this file when done (e.g. data/csv_to_windows.prom)')
+    parser.add_argument('--labels', default=None, help='JSON file mapping recording basename (without .csv/.cols) to class label, e.g. {"walk_01": "walk", "mug_03": "mugging"}')
     args = parser.parse_args()
     feature_list = args.features.split(',') if args.features else None
-    main(input_dir=args.input_dir, out_dir=args.out_dir, seq_len=args.seq_len, stride=args.stride, feature_list=feature_list, target_hz=args.target_hz)
+    labels = None
+    if args.labels:
+        with open(args.labels) as f:
+            labels = json.load(f)
+    main(input_dir=args.input_dir, out_dir=args.out_dir, seq_len=args.seq_len, stride=args.stride, feature_list=feature_list, target_hz=args.target_hz, metrics_out=args.metrics_out, labels=labels)
@@ -0,0 +1,258 @@
+"""
+Window-level deduplication for the stacked window store written by csv_to_windows (data/windows.npy).
+
+Two passes over the normalized (seq_len, F) windows:
+- exact: hash of the window quantized to `quant_step` (so float noise below the step does not matter)
+- near-duplicate: random-projection (SimHash) signatures split into LSH bands; windows sharing a band
+  key are candidates and are confirmed with cosine similarity >= `threshold`
+
+Both store-reading stages run in shards across worker processes:
+1. signatures: each worker hashes and projects its contiguous slice of the memory-mapped store
+2. candidate pairs (in memory, from the signatures only): windows sharing a band key are paired with the
+   first `max_bucket` windows of that bucket, so the run is sub-quadratic in the number of windows
+3. verification: pairs are partitioned by the later window's shard; each worker reads its contiguous
+   slice plus the sorted set of earlier candidates it needs and returns the pairs above `threshold`
+The exact-hash pass and the final keep decisions are in-memory and sequential: walking the store in index
+order, a window is dropped if it matches an earlier kept window, so the first occurrence (lowest store
+index) of every duplicate group is kept, independent of the worker count.
+
+Outputs (in --data_dir by default):
+- windows_dedup_index.npy   sorted int64 store indices of the windows to keep
+- dedup_report.json         totals and per-source counts of exact / near-duplicate drops
+
+Usage:
+    python -m src.tools.dedup_windows --data_dir data --workers 4 --threshold 0.98
+"""
+import os
+import json
+import hashlib
+import argparse
+import numpy as np
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _quantized_hash(win, quant_step):
+    q = np.round(np.asarray(win, dtype='float64') / quant_step).astype('<i4')
+    return hashlib.blake2b(q.tobytes(), digest_size=16).digest()
+
+
+def _shard_signatures(args):
+    """Worker: exact hashes, packed SimHash signatures and norms for store rows [start, stop)."""
+    store_path, start, stop, planes, quant_step = args
+    store = np.load(store_path, mmap_mode='r')
+    block = np.asarray(store[start:stop], dtype='float32').reshape(stop - start, -1)
+    hashes = [_quantized_hash(row, quant_step) for row in block]
+    bits = (block @ planes) > 0
+    signatures = np.packbits(bits, axis=1)
+    norms = np.linalg.norm(block, axis=1)
+    return start, hashes, signatures, norms
+
+
+def _shards(n, shard_size):
+    return [(s, min(n, s + shard_size)) for s in range(0, n, shard_size)]
+
+
+def compute_signatures(store_path, n_bits=128, quant_step=1e-3, seed=0, workers=1, shard_size=4096):
+    """Returns (hashes, signatures (N, n_bits/8) uint8, norms (N,)) for every window in the store."""
+    store = np.load(store_path, mmap_mode='r')
+    n = store.shape[0]
+    dim = int(np.prod(store.shape[1:]))
+    planes = np.random.default_rng(seed).standard_normal((dim, n_bits)).astype('float32')
+    hashes = [None] * n
+    signatures = np.zeros((n, n_bits // 8), dtype=np.uint8)
+    norms = np.zeros(n, dtype='float32')
+    jobs = [(store_path, s, e, planes, quant_step) for s, e in _shards(n, shard_size)]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_shard_signatures, jobs))
+    else:
+        results = [_shard_signatures(job) for job in jobs]
+    for start, shard_hashes, shard_sigs, shard_norms in results:
+        stop = start + len(shard_hashes)
+        hashes[start:stop] = shard_hashes
+        signatures[start:stop] = shard_sigs
+        norms[start:stop] = shard_norms
+    return hashes, signatures, norms
+
+
+def _candidate_pairs(signatures, rows, bands, max_bucket):
+    """(i, j) pairs with j < i sharing an LSH band key; each bucket compares against its first max_bucket rows."""
+    band_bytes = signatures.shape[1] // bands
+    n = signatures.shape[0]
+    codes = []
+    triu = {}
+    for b in range(bands):
+        keys = np.ascontiguousarray(signatures[rows, b * band_bytes:(b + 1) * band_bytes]).view(f'V{band_bytes}').ravel()
+        _, group = np.unique(keys, return_inverse=True)
+        order = np.lexsort((rows, group))
+        sorted_group = group[order]
+        bounds = np.flatnonzero(np.diff(sorted_group)) + 1
+        for members in np.split(rows[order], bounds):
+            if len(members) < 2:
+                continue
+            head = members[:max_bucket]
+            if len(head) not in triu:
+                triu[len(head)] = np.triu_indices(len(head), 1)
+            a, c = triu[len(head)]
+            codes.append(head[c] * n + head[a])
+            tail = members[max_bucket:]
+            if len(tail):
+                codes.append((tail[:, None] * n + head[None, :]).ravel())
+    if not codes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    codes = np.concatenate(codes).astype(np.int64)
+    # sort + adjacent compare: much faster than np.unique's hash path for tens of millions of codes
+    codes.sort()
+    codes = codes[np.concatenate(([True], codes[1:] != codes[:-1]))]
+    return codes // n, codes % n
+
+
+def _verify_shard(args):
+    """Worker: cosine similarity of pairs (i in [start, stop), j < i); returns the pairs >= threshold."""
+    store_path, start, stop, pi, pj, norms_i, js, norms_j, threshold = args
+    chunk = 4096
+    store = np.load(store_path, mmap_mode='r')
+    block = np.asarray(store[start:stop], dtype='float32').reshape(stop - start, -1)
+    # one sorted fancy read for all earlier windows this shard needs
+    others = np.asarray(store[js], dtype='float32').reshape(len(js), -1)
+    pos = np.searchsorted(js, pj)
+    sims = np.empty(len(pi), dtype='float32')
+    for c in range(0, len(pi), chunk):
+        sl = slice(c, c + chunk)
+        sims[sl] = np.einsum('ij,ij->i', block[pi[sl] - start], others[pos[sl]])
+    denom = norms_i * norms_j[pos]
+    sims = np.divide(sims, denom, out=np.zeros_like(sims), where=denom > 0)
+    ok = sims >= threshold
+    return pi[ok], pj[ok], sims[ok]
+
+
+def find_duplicates(store_path, n_bits=128, bands=8, threshold=0.98, quant_step=1e-3, seed=0, workers=1,
+                    shard_size=4096, max_bucket=256):
+    """
+    Returns (keep, reason, dup_of): boolean keep mask over store rows, and for dropped rows the reason
+    ('exact' or 'near') and the index of the kept window they duplicate.
+    """
+    if n_bits % 8 or (n_bits // 8) % bands:
+        raise ValueError("n_bits must be a multiple of 8 and its bytes divisible by bands")
+    store = np.load(store_path, mmap_mode='r')
+    n = store.shape[0]
+    hashes, signatures, norms = compute_signatures(store_path, n_bits=n_bits, quant_step=quant_step, seed=seed,
+                                                   workers=workers, shard_size=shard_size)
+    keep = np.ones(n, dtype=bool)
+    reason = {}
+    dup_of = {}
+
+    # exact pass
+    first_seen = {}
+    for i, h in enumerate(hashes):
+        j = first_seen.setdefault(h, i)
+        if j != i:
+            keep[i] = False
+            reason[i] = 'exact'
+            dup_of[i] = j
+
+    # near-duplicate pass: candidate pairs among exact-unique windows, verified in shards
+    pi, pj = _candidate_pairs(signatures, np.flatnonzero(keep), bands, max_bucket)
+    jobs = []
+    for start, stop in _shards(n, shard_size):
+        lo, hi = np.searchsorted(pi, [start, stop])
+        if lo == hi:
+            continue
+        js = np.unique(pj[lo:hi])
+        jobs.append((store_path, start, stop, pi[lo:hi], pj[lo:hi], norms[pi[lo:hi]], js, norms[js], threshold))
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_verify_shard, jobs))
+    else:
+        results = [_verify_shard(job) for job in jobs]
+    matches = defaultdict(list)
+    for mi, mj, ms in results:
+        for i, j, sim in zip(mi.tolist(), mj.tolist(), ms.tolist()):
+            matches[i].append((-sim, j))
+    # in index order, so every j < i already has its final keep decision
+    for i in sorted(matches):
+        for _, j in sorted(matches[i]):
+            if keep[j]:
+                keep[i] = False
+                reason[i] = 'near'
+                dup_of[i] = j
+                break
+    return keep, reason, dup_of
+
+
+def _metadata_by_index(metadata, n):
+    if metadata is None:
+        return [{} for _ in range(n)]
+    if all('index' in m for m in metadata):
+        ordered = [{} for _ in range(n)]
+        for m in metadata:
+            if 0 <= m['index'] < n:
+                ordered[m['index']] = m
+        return ordered
+    if len(metadata) == n:
+        return metadata
+    return [{} for _ in range(n)]
+
+
+def build_report(keep, reason, metadata):
+    per_source = defaultdict(lambda: {'total': 0, 'kept': 0, 'exact': 0, 'near': 0})
+    for i, m in enumerate(metadata):
+        src = per_source[m.get('source', 'unknown')]
+        src['total'] += 1
+        if keep[i]:
+            src['kept'] += 1
+        else:
+            src[reason[i]] += 1
+    return {
+        'total': int(len(keep)),
+        'kept': int(keep.sum()),
+        'dropped_exact': sum(1 for r in reason.values() if r == 'exact'),
+        'dropped_near': sum(1 for r in reason.values() if r == 'near'),
+        'per_source': dict(sorted(per_source.items())),
+    }
+
+
+def main(data_dir="data", store_path=None, metadata_path=None, out_dir=None, n_bits=128, bands=8, threshold=0.98,
+         quant_step=1e-3, seed=0, workers=1, shard_size=4096, max_bucket=256):
+    store_path = store_path or os.path.join(data_dir, "windows.npy")
+    metadata_path = metadata_path or os.path.join(data_dir, "metadata.json")
+    out_dir = out_dir or data_dir
+    if not os.path.exists(store_path):
+        print("No window store found at", store_path, "- run src.tools.csv_to_windows first")
+        return None
+    os.makedirs(out_dir, exist_ok=True)
+    keep, reason, dup_of = find_duplicates(store_path, n_bits=n_bits, bands=bands, threshold=threshold, quant_step=quant_step,
+                                           seed=seed, workers=workers, shard_size=shard_size, max_bucket=max_bucket)
+    metadata = None
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+    report = build_report(keep, reason, _metadata_by_index(metadata, len(keep)))
+    report['params'] = {'n_bits': n_bits, 'bands': bands, 'threshold': threshold, 'quant_step': quant_step, 'seed': seed}
+    index_path = os.path.join(out_dir, "windows_dedup_index.npy")
+    np.save(index_path, np.flatnonzero(keep).astype(np.int64))
+    report_path = os.path.join(out_dir, "dedup_report.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Kept {report['kept']}/{report['total']} windows "
+          f"(dropped {report['dropped_exact']} exact, {report['dropped_near']} near-duplicates). "
+          f"Index: {index_path}, report: {report_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data_dir', default='data', help='Folder containing windows.npy and metadata.json')
+    parser.add_argument('--out_dir', default=None, help='Where to write the index and report (defaults to data_dir)')
+    parser.add_argument('--n_bits', type=int, default=128, help='Random-projection signature length')
+    parser.add_argument('--bands', type=int, default=8, help='Number of LSH bands the signature is split into')
+    parser.add_argument('--threshold', type=float, default=0.98, help='Cosine similarity above which windows are near-duplicates')
+    parser.add_argument('--quant_step', type=float, default=1e-3, help='Quantization step for exact hashing')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shard_size', type=int, default=4096)
+    parser.add_argument('--max_bucket', type=int, default=256, help='Max windows kept per LSH bucket (bounds comparisons)')
+    args = parser.parse_args()
+    main(data_dir=args.data_dir, out_dir=args.out_dir, n_bits=args.n_bits, bands=args.bands, threshold=args.threshold,
+         quant_step=args.quant_step, seed=args.seed, workers=args.workers, shard_size=args.shard_size, max_bucket=args.max_bucket)
@@ -1,94 +1,264 @@
 """
-Representative dataset generator that samples from a folder of .npy window files or from data/sample.npy.
+Representative dataset generator for TFLite post-training quantization.
 
-It looks for:
-- data/rep_windows/*.npy  (each file is a single window shaped (seq_len, features))
-- fallback to data/sample.npy (T x F) and generate sliding windows
-- final fallback to synthetic random samples
+Sources, in order of preference:
+- data/windows.npy   stacked window store (N, seq_len, features) written by csv_to_windows, read through a
+                     memory-mapped view and sampled with class/source stratification from data/metadata.json
+- data/rep_windows/*.npy  legacy one-file-per-window folder (same stratified sampling when metadata is available)
+- data/sample.npy    (T x F) long array, memory-mapped; sliding windows are cut and standardized
+- synthetic random samples
+
+Windows produced by csv_to_windows are already normalized per window, so they are yielded as-is.
+Stratification splits the sample budget evenly across labels (so rare classes such as mugging are
+always covered when calibrating int8 ranges) and, within a label, evenly across sources.
+Pass `seed` for a reproducible calibration set.
 
 Yields representative samples shaped as [1, seq_len, features]
 """
 import numpy as np
 import os
 import glob
-import random
 import json
+from collections import defaultdict
+
+DEFAULT_STRATIFY = ('label', 'source')
+
 
 def _standardize_window(win):
-    mean = np.mean(win, axis=0, keepdims=True)
-    std = np.std(win, axis=0, keepdims=True) + 1e-6
+    # works on a single (seq_len, F) window or a batch (B, seq_len, F)
+    mean = np.mean(win, axis=-2, keepdims=True)
+    std = np.std(win, axis=-2, keepdims=True) + 1e-6
     return (win - mean) / std
 
-def representative_generator_from_folder(folder="data/rep_windows", num_samples=100):
+
+def _load_metadata(path):
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _allocate(n, sizes):
+    """Split n draws as evenly as possible across groups, capped by group size (water-filling).
+    If n exceeds the total capacity, the excess is spread evenly and drawn with replacement."""
+    quotas = [0] * len(sizes)
+    remaining = n
+    open_groups = [i for i, s in enumerate(sizes) if s > 0]
+    while remaining > 0 and open_groups:
+        share, extra = divmod(remaining, len(open_groups))
+        still_open = []
+        for rank, i in enumerate(open_groups):
+            want = share + (1 if rank < extra else 0)
+            take = min(want, sizes[i] - quotas[i])
+            quotas[i] += take
+            remaining -= take
+            if quotas[i] < sizes[i]:
+                still_open.append(i)
+        if len(still_open) == len(open_groups):
+            break
+        open_groups = still_open
+    if remaining > 0:
+        nonempty = [i for i, s in enumerate(sizes) if s > 0]
+        share, extra = divmod(remaining, len(nonempty))
+        for rank, i in enumerate(nonempty):
+            quotas[i] += share + (1 if rank < extra else 0)
+    return quotas
+
+
+def _stratified_pick(indices, metadata, keys, n, rng):
+    if n <= 0 or len(indices) == 0:
+        return np.empty(0, dtype=np.int64)
+    if not keys:
+        return rng.choice(indices, size=n, replace=n > len(indices))
+    groups = defaultdict(list)
+    for i in indices:
+        groups[metadata[i].get(keys[0])].append(i)
+    names = sorted(groups, key=str)
+    quotas = _allocate(n, [len(groups[g]) for g in names])
+    picks = [_stratified_pick(np.asarray(groups[g], dtype=np.int64), metadata, keys[1:], q, rng)
+             for g, q in zip(names, quotas) if q]
+    return np.concatenate(picks)
+
+
+def stratified_indices(metadata, num_samples, stratify=DEFAULT_STRATIFY, rng=None):
+    """
+    Choose `num_samples` window indices from `metadata` (list of dicts), balanced over the
+    metadata keys in `stratify` (hierarchically: first key, then second within it, ...).
+    Entries missing a key form their own group. Returned order is shuffled.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    picked = _stratified_pick(np.arange(len(metadata), dtype=np.int64), metadata, tuple(stratify), num_samples, rng)
+    return picked[rng.permutation(len(picked))]
+
+
+def _sample_plan(count, metadata, num_samples, stratify, rng):
+    """Indices into a store of `count` windows; stratified when metadata lines up with the store."""
+    if metadata is not None and len(metadata) == count and stratify:
+        return stratified_indices(metadata, num_samples, stratify=stratify, rng=rng)
+    return rng.choice(count, size=num_samples, replace=num_samples > count)
+
+
+def _yield_batches(indices, read_batch, batch_size, standardize):
+    for b in range(0, len(indices), batch_size):
+        batch_idx = indices[b:b + batch_size]
+        # read in ascending order for sequential access on the mapped file, then restore sampling order
+        order = np.argsort(batch_idx, kind='stable')
+        batch = np.empty((len(batch_idx),) + read_batch.window_shape, dtype='float32')
+        keep = np.empty(len(batch_idx), dtype=bool)
+        batch[order], keep[order] = read_batch(batch_idx[order])
+        if standardize:
+            batch = _standardize_window(batch).astype('float32')
+        for win in batch[keep]:
+            yield [win[np.newaxis]]
+
+
+def _store_reader(store):
+    def read(idx):
+        return np.asarray(store[idx], dtype='float32'), np.ones(len(idx), dtype=bool)
+    read.window_shape = tuple(store.shape[1:])
+    return read
+
+
+def _files_reader(files, window_shape):
+    def read(idx):
+        out = np.zeros((len(idx),) + window_shape, dtype='float32')
+        keep = np.ones(len(idx), dtype=bool)
+        cache = {}
+        for j, i in enumerate(idx):
+            if i not in cache:
+                try:
+                    cache[i] = np.load(files[i]).reshape(window_shape)
+                except Exception:
+                    # skip corrupted or mis-shaped windows
+                    cache[i] = None
+            if cache[i] is None:
+                keep[j] = False
+            else:
+                out[j] = cache[i]
+        return out, keep
+    read.window_shape = window_shape
+    return read
+
+
+def representative_generator_from_store(store_path="data/windows.npy", metadata_path="data/metadata.json", num_samples=100,
+                                        stratify=DEFAULT_STRATIFY, seed=None, batch_size=32, standardize=False):
+    """
+    Samples windows from a stacked (N, seq_len, features) .npy store through a memory-mapped view.
+    Returns None if the store is missing, unreadable or not exactly covered by the metadata "index" values,
+    otherwise a generator.
+    """
+    if not os.path.exists(store_path):
+        return None
+    try:
+        store = np.load(store_path, mmap_mode='r')
+    except Exception:
+        return None
+    if store.ndim != 3 or store.shape[0] == 0:
+        return None
+    rng = np.random.default_rng(seed)
+    metadata = _load_metadata(metadata_path)
+    if metadata is not None:
+        # metadata written alongside the store is keyed by store row; anything else describes a different
+        # (e.g. stale) store, which must not be sampled
+        if len(metadata) != store.shape[0] or sorted(m.get('index', -1) for m in metadata) != list(range(store.shape[0])):
+            return None
+        metadata = sorted(metadata, key=lambda m: m['index'])
+    indices = _sample_plan(store.shape[0], metadata, num_samples, stratify, rng)
+    return _yield_batches(indices, _store_reader(store), batch_size, standardize)
+
+
+def representative_generator_from_folder(folder="data/rep_windows", num_samples=100, metadata_path=None,
+                                         stratify=DEFAULT_STRATIFY, seed=None, batch_size=32, standardize=False):
     """
-    Samples random .npy window files from a folder. Each .npy should be (seq_len, features).
-    Yields lists of numpy arrays as required by the TFLite converter.
+    Samples .npy window files from a folder. Each .npy should be (seq_len, features).
+    Returns None if the folder has no usable windows, otherwise a generator yielding lists of
+    numpy arrays as required by the TFLite converter.
     """
     if not os.path.exists(folder):
         return None
-    files = glob.glob(os.path.join(folder, "*.npy"))
+    metadata = _load_metadata(metadata_path)
+    if metadata and all('file' in m for m in metadata):
+        files = [os.path.join(folder, m['file']) for m in metadata]
+        if not all(os.path.exists(fn) for fn in files):
+            metadata = None
+    else:
+        metadata = None
+    if metadata is None:
+        files = sorted(glob.glob(os.path.join(folder, "*.npy")))
     if not files:
         return None
-    for _ in range(num_samples):
-        fn = random.choice(files)
-        try:
-            win = np.load(fn).astype('float32')
-        except Exception:
-            # skip corrupted
-            continue
-        # ensure 2D
-        if win.ndim == 1:
-            win = win.reshape(-1,1)
-        win = _standardize_window(win)
-        yield [win.reshape(1, win.shape[0], win.shape[1])]
+    try:
+        first = np.load(files[0], mmap_mode='r')
+    except Exception:
+        return None
+    window_shape = first.shape if first.ndim == 2 else (first.shape[0], 1)
+    rng = np.random.default_rng(seed)
+    indices = _sample_plan(len(files), metadata, num_samples, stratify, rng)
+    return _yield_batches(indices, _files_reader(files, window_shape), batch_size, standardize)
+
 
 def _load_sample(path="data/sample.npy"):
     if os.path.exists(path):
         try:
-            data = np.load(path)
+            data = np.load(path, mmap_mode='r')
             if data.ndim == 1:
-                data = data.reshape(-1,1)
-            return data.astype('float32')
+                data = data.reshape(-1, 1)
+            return data
         except Exception:
             return None
     return None
 
-def representative_generator(num_samples=100, seq_len=100, features=10, sample_path="data/sample.npy", folder="data/rep_windows"):
+
+def representative_generator_from_sample(data, num_samples=100, seq_len=100, features=10, seed=None, batch_size=32):
+    """Cuts random (seq_len, features) windows out of a (T, F) array and standardizes each one."""
+    rng = np.random.default_rng(seed)
+    T, F = data.shape
+    starts = rng.integers(0, max(1, T - seq_len + 1), size=num_samples)
+    width = min(F, features)
+    for b in range(0, num_samples, batch_size):
+        batch_starts = starts[b:b + batch_size]
+        batch = np.zeros((len(batch_starts), seq_len, features), dtype='float32')
+        for j, start in enumerate(batch_starts):
+            win = data[start:start + seq_len, :width]
+            batch[j, :win.shape[0], :width] = win
+        batch = _standardize_window(batch).astype('float32')
+        for win in batch:
+            yield [win[np.newaxis]]
+
+
+def representative_generator(num_samples=100, seq_len=100, features=10, sample_path="data/sample.npy", folder="data/rep_windows",
+                             store_path=None, metadata_path=None, stratify=DEFAULT_STRATIFY, seed=None, batch_size=32):
     """
-    Top-level representative generator. Prefers folder of precomputed windows, then data/sample.npy, then synthetic.
+    Top-level representative generator. Prefers the stacked window store, then the folder of
+    precomputed windows, then data/sample.npy, then synthetic. `store_path` and `metadata_path`
+    default to windows.npy / metadata.json next to `folder`.
     """
-    # try folder of .npy windows
-    gen = representative_generator_from_folder(folder=folder, num_samples=num_samples)
+    base = os.path.dirname(os.path.normpath(folder))
+    if store_path is None:
+        store_path = os.path.join(base, "windows.npy")
+    if metadata_path is None:
+        metadata_path = os.path.join(base, "metadata.json")
+
+    gen = representative_generator_from_store(store_path, metadata_path, num_samples=num_samples,
+                                              stratify=stratify, seed=seed, batch_size=batch_size)
+    if gen is None:
+        gen = representative_generator_from_folder(folder=folder, num_samples=num_samples, metadata_path=metadata_path,
+                                                   stratify=stratify, seed=seed, batch_size=batch_size)
     if gen is not None:
-        for item in gen:
-            yield item
+        yield from gen
         return
 
     # try aggregated sample file
     data = _load_sample(sample_path)
     if data is None or data.shape[0] < seq_len:
+        rng = np.random.default_rng(seed)
         for _ in range(num_samples):
-            sample = np.random.randn(1, seq_len, features).astype('float32')
+            sample = rng.standard_normal((1, seq_len, features)).astype('float32')
             yield [sample]
         return
 
-    T, F = data.shape
-    if F < features:
-        pad_width = features - F
-        data = np.pad(data, ((0,0),(0,pad_width)), mode='constant')
-        F = features
-    elif F > features:
-        data = data[:, :features]
-        F = features
-
-    for _ in range(num_samples):
-        if T == seq_len:
-            start = 0
-        else:
-            start = np.random.randint(0, max(1, T - seq_len))
-        win = data[start:start+seq_len]
-        if win.shape[0] < seq_len:
-            pad_len = seq_len - win.shape[0]
-            win = np.vstack([win, np.zeros((pad_len, F), dtype='float32')])
-        win = _standardize_window(win)
-        yield [win.reshape(1, seq_len, F)]
+    yield from representative_generator_from_sample(data, num_samples=num_samples, seq_len=seq_len, features=features,
+                                                    seed=seed, batch_size=batch_size)
@@ -21,6 +21,7 @@ def plot_window(path, out='figures/window_plot.png'):
         plt.ylabel('value')
         plt.tight_layout()
         plt.savefig(out)
+        plt.close()
         print(f"Saved window plot to {out}")
     else:
         print("Unsupported window shape:", win.shape)
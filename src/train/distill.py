@@ -0,0 +1,215 @@
+"""
+Knowledge distillation of the TCN (teacher, src.model.tcn.build_tcn) into the MCU-sized student
+(src.model.tcn.build_tiny_tcn), followed by full-int8 export and a budget report.
+
+The teacher's softmax outputs are softened with a temperature once up front; the student is trained on its
+'logits' layer with  alpha * T^2 * CE(teacher_T, student_T) + (1 - alpha) * CE(labels, student).
+The exported student (int8 weights, activations, input and output) is profiled per op with
+src.model.tflite_profile and checked against the flash / arena / latency budget.
+
+Data: labelled windows from the stacked store (data/windows.npy + metadata.json with "label", see
+csv_to_windows --labels), else synthetic walk/drive/mugging windows from generate_synthetic.
+
+Usage:
+    python -m src.train.distill --teacher checkpoints/best_model.keras --out_dir checkpoints/student
+    python -m src.train.distill --teacher_epochs 10 --epochs 30 --arena_kb 8 --flash_kb 32 --latency_ms 0.5
+"""
+import os
+import json
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import EarlyStopping
+from src.model.tcn import build_tcn, build_tiny_tcn
+from src.model.export_tflite import export_model_to_tflite
+from src.model.tflite_runner import TFLiteClassifier
+from src.model.tflite_profile import profile_tflite, check_budget, format_report
+
+CLASSES = ('walk', 'drive', 'mugging')
+
+
+def ensure_dir(d):
+    os.makedirs(d, exist_ok=True)
+
+
+def load_labelled_windows(data_dir='data', classes=CLASSES):
+    """Return (X, y) from the window store, keeping windows whose label is in `classes`; None if unavailable."""
+    store_path = os.path.join(data_dir, 'windows.npy')
+    metadata_path = os.path.join(data_dir, 'metadata.json')
+    if not (os.path.exists(store_path) and os.path.exists(metadata_path)):
+        return None
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    keep = [(m['index'], classes.index(m['label'])) for m in metadata if 'index' in m and m.get('label') in classes]
+    if not keep:
+        return None
+    store = np.load(store_path, mmap_mode='r')
+    idx, y = zip(*sorted(keep))
+    return np.asarray(store[list(idx)], dtype='float32'), np.asarray(y)
+
+
+def synthetic_windows(n_per_class=200, seq_len=100, classes=CLASSES, seed=0):
+    """Labelled synthetic windows, normalized per window like csv_to_windows."""
+    from src.tools.generate_synthetic import _simulate_segment
+    np.random.seed(seed)
+    X, y = [], []
+    for label, kind in enumerate(classes):
+        for _ in range(n_per_class):
+            win = _simulate_segment(kind=kind, length=seq_len).astype('float32')
+            X.append((win - win.mean(axis=0)) / (win.std(axis=0) + 1e-6))
+            y.append(label)
+    return np.stack(X), np.asarray(y)
+
+
+def fit_to_input(X, input_shape):
+    """
+    Zero-pad or truncate (N, seq_len, F) windows to a model's (seq_len, features), as
+    representative_generator_from_sample does (e.g. 7-channel stores or 9-channel synthetic data for a
+    10-feature teacher). Padded channels are constant zero, i.e. "no sensor".
+    """
+    seq_len = X.shape[1] if input_shape[1] is None else int(input_shape[1])
+    features = int(input_shape[2])
+    if X.shape[1:] == (seq_len, features):
+        return X
+    print(f"Fitting windows {X.shape[1:]} to the teacher input ({seq_len}, {features}) by zero-padding/truncating")
+    out = np.zeros((len(X), seq_len, features), dtype='float32')
+    t, f = min(seq_len, X.shape[1]), min(features, X.shape[2])
+    out[:, :t, :f] = X[:, :t, :f]
+    return out
+
+
+def soften(probs, temperature):
+    """Re-temper softmax outputs: softmax(log(p) / T)."""
+    logits = np.log(np.clip(probs, 1e-7, 1.0)) / temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    e = np.exp(logits)
+    return (e / e.sum(axis=1, keepdims=True)).astype('float32')
+
+
+def distillation_loss(num_classes, temperature=4.0, alpha=0.7):
+    """Loss on student logits; y_true is [one-hot labels | softened teacher probabilities]."""
+    def loss(y_true, logits):
+        hard, soft = y_true[:, :num_classes], y_true[:, num_classes:]
+        ce = tf.nn.softmax_cross_entropy_with_logits(labels=hard, logits=logits)
+        # cross-entropy to soft targets = KL + constant teacher entropy, so the gradients match KL
+        kd = tf.nn.softmax_cross_entropy_with_logits(labels=soft, logits=logits / temperature)
+        return alpha * temperature ** 2 * kd + (1.0 - alpha) * ce
+    return loss
+
+
+def distill(teacher, X_train, y_train, X_val, y_val, temperature=4.0, alpha=0.7, epochs=30, batch_size=32,
+            learning_rate=3e-3, **student_kwargs):
+    """
+    Train build_tiny_tcn(**student_kwargs) on the teacher's soft targets.
+    y_train / y_val are integer class ids. Returns (student, history dict).
+    """
+    num_classes = int(teacher.output_shape[-1])
+    targets = []
+    for X, y in ((X_train, y_train), (X_val, y_val)):
+        soft = soften(teacher.predict(X, batch_size=256, verbose=0), temperature)
+        targets.append(np.concatenate([tf.keras.utils.to_categorical(y, num_classes), soft], axis=1))
+    student = build_tiny_tcn(input_shape=X_train.shape[1:], num_classes=num_classes, **student_kwargs)
+    trainer = tf.keras.Model(student.input, student.get_layer('logits').output)
+    trainer.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+                    loss=distillation_loss(num_classes, temperature=temperature, alpha=alpha))
+    history = trainer.fit(X_train, targets[0], validation_data=(X_val, targets[1]), epochs=epochs, batch_size=batch_size,
+                          callbacks=[EarlyStopping(monitor='val_loss', patience=6, restore_best_weights=True)], verbose=2)
+    return student, history.history
+
+
+def _accuracy(probs, y):
+    return float(np.mean(np.argmax(probs, axis=1) == y))
+
+
+def main(data_dir='data', teacher_path=None, out_dir='checkpoints/student', classes=CLASSES, epochs=30, teacher_epochs=10,
+         batch_size=32, temperature=4.0, alpha=0.7, num_filters=12, num_blocks=4, rep_samples=200,
+         arena_kb=8, flash_kb=32, latency_ms=0.5, profile_runs=200, seed=0):
+    """
+    Distill, export student_int8.tflite and write student_report.json to out_dir.
+    Budgets: arena/flash in KB, latency in ms per window (single thread, reference kernels, on this host).
+    Returns the report dict; report['violations'] is empty when the student fits the budget.
+    """
+    ensure_dir(out_dir)
+    tf.keras.utils.set_random_seed(seed)
+    teacher = tf.keras.models.load_model(teacher_path) if teacher_path else None
+    data = load_labelled_windows(data_dir, classes)
+    source = os.path.join(data_dir, 'windows.npy')
+    if data is None:
+        print("No labelled window store in", data_dir, "- using synthetic windows")
+        seq_len = teacher.input_shape[1] if teacher is not None and teacher.input_shape[1] else 100
+        data = synthetic_windows(seq_len=seq_len, classes=classes, seed=seed)
+        source = 'synthetic'
+    X, y = data
+    if teacher is not None:
+        if int(teacher.output_shape[-1]) != len(classes):
+            raise ValueError(f"Teacher predicts {teacher.output_shape[-1]} classes but {len(classes)} were given: {classes}")
+        X = fit_to_input(X, teacher.input_shape)
+    perm = np.random.default_rng(seed).permutation(len(X))
+    split = int(0.8 * len(X))
+    X_train, y_train, X_val, y_val = X[perm[:split]], y[perm[:split]], X[perm[split:]], y[perm[split:]]
+
+    if teacher is None:
+        print(f"No teacher given - training build_tcn for {teacher_epochs} epochs")
+        teacher = build_tcn(input_shape=X.shape[1:], num_classes=len(classes))
+        teacher.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=1e-3), loss='sparse_categorical_crossentropy')
+        teacher.fit(X_train, y_train, validation_data=(X_val, y_val), epochs=teacher_epochs, batch_size=batch_size, verbose=2)
+
+    student, history = distill(teacher, X_train, y_train, X_val, y_val, temperature=temperature, alpha=alpha,
+                               epochs=epochs, batch_size=batch_size, num_filters=num_filters, num_blocks=num_blocks)
+    student.save(os.path.join(out_dir, 'student.keras'))
+
+    rep_idx = np.random.default_rng(seed).choice(len(X_train), size=min(rep_samples, len(X_train)), replace=False)
+    tflite_path = export_model_to_tflite(student, os.path.join(out_dir, 'student_int8.tflite'), int8_io=True,
+                                         representative_data=lambda: ([X_train[i:i + 1]] for i in rep_idx))
+
+    teacher_probs = teacher.predict(X_val, batch_size=256, verbose=0)
+    student_probs = student.predict(X_val, batch_size=256, verbose=0)
+    clf = TFLiteClassifier(tflite_path, num_threads=1)
+    int8_probs = np.stack([clf.predict(w) for w in X_val])
+    report = profile_tflite(tflite_path, runs=profile_runs, reference_kernels=True)
+    report.update({
+        'data': source,
+        'classes': list(classes),
+        'teacher_params': int(teacher.count_params()),
+        'student_params': int(student.count_params()),
+        'accuracy': {'teacher': _accuracy(teacher_probs, y_val), 'student': _accuracy(student_probs, y_val),
+                     'student_int8': _accuracy(int8_probs, y_val)},
+        'teacher_agreement_int8': float(np.mean(np.argmax(int8_probs, axis=1) == np.argmax(teacher_probs, axis=1))),
+        'budget': {'arena_kb': arena_kb, 'flash_kb': flash_kb, 'latency_ms': latency_ms},
+        'violations': check_budget(report, arena_kb=arena_kb, flash_kb=flash_kb, latency_ms=latency_ms),
+        'history': {k: [float(v) for v in vals] for k, vals in history.items()},
+    })
+    with open(os.path.join(out_dir, 'student_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    print(format_report(report))
+    acc = report['accuracy']
+    print(f"params {report['teacher_params']} -> {report['student_params']}; val accuracy teacher {acc['teacher']:.3f}, "
+          f"student {acc['student']:.3f}, student int8 {acc['student_int8']:.3f} "
+          f"(agrees with teacher on {report['teacher_agreement_int8']:.1%})")
+    for v in report['violations']:
+        print("Over budget:", v)
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data_dir', default='data')
+    parser.add_argument('--teacher', default=None, help='Trained teacher (.keras/.h5 full model); trained from scratch if omitted')
+    parser.add_argument('--out_dir', default='checkpoints/student')
+    parser.add_argument('--classes', default=','.join(CLASSES), help='Comma-separated labels in class-index order')
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--teacher_epochs', type=int, default=10)
+    parser.add_argument('--batch_size', type=int, default=32)
+    parser.add_argument('--temperature', type=float, default=4.0)
+    parser.add_argument('--alpha', type=float, default=0.7, help='Weight of the soft-target term')
+    parser.add_argument('--filters', type=int, default=12)
+    parser.add_argument('--blocks', type=int, default=4)
+    parser.add_argument('--arena_kb', type=float, default=8)
+    parser.add_argument('--flash_kb', type=float, default=32)
+    parser.add_argument('--latency_ms', type=float, default=0.5)
+    args = parser.parse_args()
+    rep = main(data_dir=args.data_dir, teacher_path=args.teacher, out_dir=args.out_dir, classes=tuple(args.classes.split(',')),
+               epochs=args.epochs, teacher_epochs=args.teacher_epochs, batch_size=args.batch_size,
+               temperature=args.temperature, alpha=args.alpha, num_filters=args.filters, num_blocks=args.blocks,
+               arena_kb=args.arena_kb, flash_kb=args.flash_kb, latency_ms=args.latency_ms)
+    raise SystemExit(1 if rep['violations'] else 0)
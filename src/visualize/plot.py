@@ -14,4 +14,5 @@ def overlay_plot(seq_a, seq_b, out='figures/overlay.png'):
     plt.xlabel('t')
     plt.ylabel('value')
     plt.savefig(out)
+    plt.close()
     print(f"Saved overlay plot to {out}")
@@ -0,0 +1,217 @@
+"""
+Batch PDF report generator for window corpora (e.g. weekly per-hotspot review packs).
+
+Renders windows from the stacked store (data/windows.npy + metadata.json, see csv_to_windows) or a
+folder of .npy windows into multi-page PDFs:
+- uses the Agg canvas directly (no pyplot state, so nothing leaks between pages)
+- each worker builds one figure with a grid of axes and reuses it for every page via Line2D.set_data
+- long series are reduced with min/max decimation before plotting, preserving spikes
+- one PDF per group (metadata key, default "source"); large groups are split into parts and all
+  parts are rendered in parallel across processes
+
+Usage:
+    python -m src.visualize.report --data_dir data --out_dir reports --group_by source --workers 4
+"""
+import os
+import json
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+
+
+def minmax_decimate(y, max_points=2000):
+    """
+    Reduce a 1-D series to at most ~max_points by keeping the min and max of each bin (in time order).
+    Returns (x, y) with x the original sample indices.
+    """
+    y = np.asarray(y)
+    n = y.shape[0]
+    if n <= max_points:
+        return np.arange(n), y
+    bins = max(1, max_points // 2)
+    size = int(np.ceil(n / bins))
+    pad = bins * size - n
+    padded = np.concatenate([y, np.full(pad, y[-1], dtype=y.dtype)]) if pad else y
+    blocks = padded.reshape(bins, size)
+    lo = np.argmin(blocks, axis=1)
+    hi = np.argmax(blocks, axis=1)
+    first = np.minimum(lo, hi)
+    second = np.maximum(lo, hi)
+    base = np.arange(bins) * size
+    x = np.empty(2 * bins, dtype=np.int64)
+    x[0::2] = base + first
+    x[1::2] = base + second
+    x = np.minimum(x, n - 1)
+    return x, y[x]
+
+
+class _PageRenderer:
+    """One reusable figure: rows x cols axes with `channels` lines each (more are added if a window is wider)."""
+
+    def __init__(self, rows=3, cols=2, channels=6, figsize=(11.69, 8.27)):
+        self.fig = Figure(figsize=figsize)
+        FigureCanvasAgg(self.fig)
+        self.axes = self.fig.subplots(rows, cols, squeeze=False).ravel()
+        self.lines = [[] for _ in self.axes]
+        for ax in self.axes:
+            ax.tick_params(labelsize=6)
+        self._ensure_channels(channels)
+        self.title = self.fig.suptitle('')
+
+    def _ensure_channels(self, channels):
+        if channels <= len(self.lines[0]):
+            return
+        for ax, lines in zip(self.axes, self.lines):
+            lines.extend(ax.plot([], [], lw=0.8, label=f'feat{c}')[0] for c in range(len(lines), channels))
+        self.axes[0].legend(fontsize=6, loc='upper right')
+
+    def draw(self, windows, titles, page_title, max_points):
+        self._ensure_channels(max((w.shape[1] for w in windows), default=0))
+        for ax, lines, win, title in zip(self.axes, self.lines, windows, titles):
+            ax.set_visible(True)
+            for c, line in enumerate(lines):
+                if c < win.shape[1]:
+                    x, y = minmax_decimate(win[:, c], max_points)
+                    line.set_data(x, y)
+                    line.set_visible(True)
+                else:
+                    line.set_visible(False)
+            ax.set_title(title, fontsize=7)
+            ax.relim(visible_only=True)
+            ax.autoscale_view()
+        for ax in self.axes[len(windows):]:
+            ax.set_visible(False)
+        self.title.set_text(page_title)
+
+
+def _render_pdf(job):
+    """Worker: render the windows at `indices` of the store into one multi-page PDF."""
+    out_path = job['out_path']
+    if job.get('store_path'):
+        store = np.load(job['store_path'], mmap_mode='r')
+        load = lambda i: np.asarray(store[i], dtype='float32')  # noqa: E731
+    else:
+        load = lambda i: np.load(i).astype('float32')  # noqa: E731
+    channels = job['channels']
+    if channels is None and job['items']:
+        # one line per channel of the data (the store has a single width; folders are sized by their first window)
+        first = load(job['items'][0][0])
+        channels = 1 if first.ndim == 1 else first.shape[1]
+    renderer = _PageRenderer(rows=job['rows'], cols=job['cols'], channels=channels or 1)
+    per_page = job['rows'] * job['cols']
+    items = job['items']
+    pages = 0
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    with PdfPages(out_path) as pdf:
+        for p in range(0, len(items), per_page):
+            chunk = items[p:p + per_page]
+            windows = []
+            for key, _ in chunk:
+                win = load(key)
+                windows.append(win.reshape(-1, 1) if win.ndim == 1 else win)
+            renderer.draw(windows, [t for _, t in chunk], f"{job['title']}  (page {p // per_page + 1})", job['max_points'])
+            pdf.savefig(renderer.fig)
+            pages += 1
+        info = pdf.infodict()
+        info['Title'] = job['title']
+    return out_path, pages
+
+
+def _group_name(value):
+    if value is None:
+        return 'ungrouped'
+    name = os.path.splitext(os.path.basename(str(value)))[0]
+    return ''.join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in name) or 'ungrouped'
+
+
+def plan_jobs(metadata, out_dir, group_by='source', store_path=None, folder=None, pages_per_file=50, rows=3, cols=2,
+              channels=None, max_points=2000):
+    """
+    Split windows into per-group PDF jobs of at most `pages_per_file` pages each.
+    channels=None plots every channel of the data.
+    """
+    groups = {}
+    for pos, m in enumerate(metadata):
+        if store_path:
+            key = m.get('index', pos)
+        else:
+            key = os.path.join(folder, m['file'])
+        title = m.get('file', str(key))
+        if m.get('label') is not None:
+            title = f"{title} [{m['label']}]"
+        groups.setdefault(_group_name(m.get(group_by)), []).append((key, title))
+    per_file = pages_per_file * rows * cols
+    jobs = []
+    for name in sorted(groups):
+        items = groups[name]
+        parts = range(0, len(items), per_file)
+        for part, start in enumerate(parts):
+            suffix = f"_part{part + 1:03d}" if len(parts) > 1 else ''
+            jobs.append({'out_path': os.path.join(out_dir, f"{name}{suffix}.pdf"), 'items': items[start:start + per_file],
+                         'store_path': store_path, 'title': name, 'rows': rows, 'cols': cols, 'channels': channels,
+                         'max_points': max_points})
+    return jobs
+
+
+def generate_reports(data_dir='data', out_dir='reports', group_by='source', workers=None, pages_per_file=50, rows=3,
+                     cols=2, channels=None, max_points=2000, index_path=None):
+    """
+    Render every window (or only those in `index_path`, e.g. windows_dedup_index.npy) into per-group PDFs.
+    Returns a list of (pdf_path, pages).
+    """
+    store_path = os.path.join(data_dir, 'windows.npy')
+    folder = os.path.join(data_dir, 'rep_windows')
+    metadata_path = os.path.join(data_dir, 'metadata.json')
+    metadata = []
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+    if os.path.exists(store_path):
+        store = np.load(store_path, mmap_mode='r')
+        n = store.shape[0]
+        if channels is None:
+            channels = store.shape[2] if store.ndim == 3 else 1
+        if not metadata or not all('index' in m for m in metadata):
+            metadata = [dict(m, index=i) for i, m in enumerate(metadata)] if len(metadata) == n else \
+                [{'file': f'window_{i}', 'index': i} for i in range(n)]
+    else:
+        store_path = None
+        if not metadata:
+            files = sorted(f for f in os.listdir(folder) if f.endswith('.npy')) if os.path.isdir(folder) else []
+            metadata = [{'file': f} for f in files]
+    if index_path:
+        keep = set(np.load(index_path).tolist())
+        metadata = [m for m in metadata if m.get('index') in keep]
+    if not metadata:
+        print("No windows found in", data_dir)
+        return []
+    jobs = plan_jobs(metadata, out_dir, group_by=group_by, store_path=store_path, folder=folder,
+                     pages_per_file=pages_per_file, rows=rows, cols=cols, channels=channels, max_points=max_points)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_render_pdf, jobs))
+    else:
+        results = [_render_pdf(job) for job in jobs]
+    print(f"Wrote {len(results)} PDF(s), {sum(p for _, p in results)} pages to {out_dir}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data_dir', default='data', help='Folder with windows.npy/metadata.json or rep_windows/')
+    parser.add_argument('--out_dir', default='reports')
+    parser.add_argument('--group_by', default='source', help='Metadata key used to split reports (e.g. source, label)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--pages_per_file', type=int, default=50)
+    parser.add_argument('--rows', type=int, default=3)
+    parser.add_argument('--cols', type=int, default=2)
+    parser.add_argument('--max_points', type=int, default=2000, help='Decimate series longer than this (min/max per bin)')
+    parser.add_argument('--index', default=None, help='Optional .npy of store indices to include (e.g. windows_dedup_index.npy)')
+    args = parser.parse_args()
+    generate_reports(data_dir=args.data_dir, out_dir=args.out_dir, group_by=args.group_by, workers=args.workers,
+                     pages_per_file=args.pages_per_file, rows=args.rows, cols=args.cols, max_points=args.max_points,
+                     index_path=args.index)
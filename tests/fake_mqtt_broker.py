@@ -0,0 +1,106 @@
+"""
+Minimal in-process MQTT 3.1.1 broker for tests (QoS 0 only): CONNECT, SUBSCRIBE, PUBLISH, PINGREQ, DISCONNECT.
+"""
+import asyncio
+
+
+def _encode_length(n):
+    out = bytearray()
+    while True:
+        byte, n = n % 128, n // 128
+        out.append(byte | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+
+def _topic_matches(pattern, topic):
+    p, t = pattern.split('/'), topic.split('/')
+    for i, part in enumerate(p):
+        if part == '#':
+            return True
+        if i >= len(t) or (part != '+' and part != t[i]):
+            return False
+    return len(p) == len(t)
+
+
+def publish_packet(topic, payload):
+    body = len(topic).to_bytes(2, 'big') + topic.encode() + payload
+    return b'\x30' + _encode_length(len(body)) + body
+
+
+class FakeBroker:
+    def __init__(self):
+        self.subscriptions = []  # (pattern, writer)
+        self.clients = set()
+        self.connections = 0
+        self.server = None
+        self.port = None
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        for _, writer in self.subscriptions:
+            writer.close()
+        await self.server.wait_closed()
+
+    def drop_clients(self):
+        """Close every client connection (as a broker restart would); the listener stays up."""
+        for writer in list(self.clients):
+            writer.close()
+        self.subscriptions = []
+
+    async def publish(self, topic, payload):
+        packet = publish_packet(topic, payload)
+        for pattern, writer in list(self.subscriptions):
+            if _topic_matches(pattern, topic):
+                writer.write(packet)
+                await writer.drain()
+
+    async def _read_packet(self, reader):
+        header = await reader.readexactly(1)
+        length, mult = 0, 1
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * mult
+            mult *= 128
+            if not byte & 0x80:
+                break
+        return header[0], await reader.readexactly(length)
+
+    async def _handle(self, reader, writer):
+        self.clients.add(writer)
+        self.connections += 1
+        try:
+            while True:
+                first, body = await self._read_packet(reader)
+                kind = first >> 4
+                if kind == 1:  # CONNECT
+                    writer.write(b'\x20\x02\x00\x00')
+                elif kind == 8:  # SUBSCRIBE
+                    packet_id, pos, granted = body[:2], 2, bytearray()
+                    while pos < len(body):
+                        n = int.from_bytes(body[pos:pos + 2], 'big')
+                        self.subscriptions.append((body[pos + 2:pos + 2 + n].decode(), writer))
+                        pos += 2 + n + 1
+                        granted.append(0)
+                    writer.write(b'\x90' + _encode_length(2 + len(granted)) + packet_id + bytes(granted))
+                elif kind == 3:  # PUBLISH from a client
+                    n = int.from_bytes(body[:2], 'big')
+                    topic = body[2:2 + n].decode()
+                    offset = 2 + n + (2 if (first >> 1) & 0x03 else 0)
+                    await self.publish(topic, body[offset:])
+                elif kind == 12:  # PINGREQ
+                    writer.write(b'\xd0\x00')
+                elif kind == 14:  # DISCONNECT
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            self.subscriptions = [(p, w) for p, w in self.subscriptions if w is not writer]
+            writer.close()
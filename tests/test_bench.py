@@ -0,0 +1,38 @@
+import json
+from src.bench import runner
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {'a': {'median': 1.0}, 'b': {'median': 1.0}, 'c': {'median': 1.0}}
+    results = {'a': {'median': 1.1}, 'b': {'median': 1.5}, 'c': {'median': 0.5}, 'd': {'median': 1.0}}
+    rows = {r[0]: r[4] for r in runner.compare_results(results, baseline, tolerance=0.2)}
+    assert rows == {'a': 'ok', 'b': 'regression', 'c': 'improved', 'd': 'new'}
+    del results['c']
+    rows = {r[0]: r[4] for r in runner.compare_results(results, baseline, tolerance=0.2)}
+    assert rows['c'] == 'missing'
+
+def test_run_save_and_compare_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(runner, 'BENCHMARKS', {})
+
+    @runner.benchmark('unit.sum')
+    def bench_sum(workdir):
+        data = list(range(1000))
+        return lambda: sum(data)
+
+    @runner.benchmark('unit.skipped')
+    def bench_skipped(workdir):
+        raise runner.SkipBenchmark('not available')
+
+    results = runner.run_benchmarks(min_rounds=3, max_time=0.01)
+    assert list(results) == ['unit.sum']
+    assert results['unit.sum']['rounds'] >= 3
+    path = runner.save_results(results, str(tmp_path / "baseline.json"))
+    assert json.load(open(path))['benchmarks']['unit.sum']['median'] > 0
+    rows = runner.compare_results(results, runner.load_results(path))
+    assert rows[0][4] == 'ok'
+
+def test_main_fails_on_missing_baseline_entries_unless_filtered(tmp_path, monkeypatch):
+    results = {'unit.a': {'median': 1.0}}
+    monkeypatch.setattr(runner, 'run_benchmarks', lambda **kwargs: dict(results))
+    path = runner.save_results({'unit.a': {'median': 1.0}, 'unit.b': {'median': 1.0}}, str(tmp_path / "baseline.json"))
+    assert runner.main(['--compare', path]) == 1
+    assert runner.main(['--compare', path, '--filter', 'unit.a']) == 0
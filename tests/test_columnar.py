@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from src.tools import columnar, csv_to_windows
+
+
+def _write_csv(path, n=400, seed=0, device=True):
+    rng = np.random.default_rng(seed)
+    offsets = np.cumsum(rng.integers(15, 31, size=n))
+    df = pd.DataFrame(rng.standard_normal((n, 3)), columns=['ax', 'ay', 'az'])
+    df.insert(0, 'timestamp', pd.Timestamp('2025-01-01') + pd.to_timedelta(offsets, unit='ms'))
+    if device:
+        df['device'] = 'pi-01'
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_roundtrip_npy_and_blocks(tmp_path):
+    csv = tmp_path / 'rec.csv'
+    df = _write_csv(csv)
+    for compress in (False, True):
+        out = str(tmp_path / f'rec_{compress}.cols')
+        meta = columnar.csv_to_columnar(str(csv), out, compress=compress, block_rows=128)
+        assert meta['dropped_columns'] == ['device']
+        assert columnar.is_columnar(out)
+        back = columnar.read_columnar(out)
+        assert list(back.columns) == ['timestamp', 'ax', 'ay', 'az']
+        assert back['ax'].dtype == np.float32
+        np.testing.assert_array_equal(back['timestamp'].to_numpy(), df['timestamp'].to_numpy())
+        np.testing.assert_allclose(back[['ax', 'ay', 'az']].to_numpy(), df[['ax', 'ay', 'az']].to_numpy(), rtol=1e-6)
+    # column pruning keeps the time column
+    assert list(columnar.read_columnar(out, columns=['ay']).columns) == ['timestamp', 'ay']
+
+
+def test_numeric_and_tz_aware_time_columns(tmp_path):
+    ts = 1735689600.0 + np.arange(300) * 0.02
+    df = pd.DataFrame({'ts': ts, 'ax': np.ones(300)})
+    for compress in (False, True):
+        out = str(tmp_path / f'epoch_{compress}.cols')
+        meta = columnar.write_columnar(df, out, compress=compress, block_rows=128)
+        assert meta['time_unit'] is None and meta['dtypes']['ts'] == 'float64'
+        np.testing.assert_array_equal(columnar.read_columnar(out)['ts'].to_numpy(), ts)
+    aware = pd.DataFrame({'timestamp': pd.date_range('2025-01-01 12:00', periods=3, freq='s', tz='Europe/Berlin'), 'ax': 1.0})
+    columnar.write_columnar(aware, str(tmp_path / 'aware.cols'))
+    back = columnar.read_columnar(str(tmp_path / 'aware.cols'))
+    assert back['timestamp'].iloc[0] == pd.Timestamp('2025-01-01 11:00')
+
+def test_csv_to_windows_reads_columnar_like_csv(tmp_path):
+    raw_csv, raw_cols = tmp_path / 'raw_csv', tmp_path / 'raw_cols'
+    raw_csv.mkdir()
+    raw_cols.mkdir()
+    _write_csv(raw_csv / 'rec.csv', device=False)
+    columnar.csv_to_columnar(str(raw_csv / 'rec.csv'), str(raw_cols / 'rec.cols'), compress=True)
+    outputs = []
+    for src in (raw_csv, raw_cols):
+        out = tmp_path / f'data_{src.name}'
+        csv_to_windows.main(input_dir=str(src), out_dir=str(out), seq_len=50, stride=25, feature_list=['ax', 'ay', 'az'], target_hz=50)
+        outputs.append(np.load(out / 'windows.npy'))
+    assert outputs[0].shape == outputs[1].shape
+    np.testing.assert_allclose(outputs[0], outputs[1], atol=1e-4)
@@ -0,0 +1,44 @@
+import json
+import numpy as np
+from src.tools import dedup_windows
+
+def _write_store(tmp_path):
+    rng = np.random.default_rng(0)
+    base = rng.standard_normal((40, 100, 4)).astype('float32')
+    exact = base[:5].copy()                                              # re-uploaded windows
+    near = base[5:10] + 0.01 * rng.standard_normal((5, 100, 4)).astype('float32')  # same motion, sensor noise
+    store = np.concatenate([base, exact, near])
+    np.save(str(tmp_path / "windows.npy"), store)
+    metadata = [{"file": f"w_{i}.npy", "source": "dev_a.csv" if i < 40 else "dev_a_reupload.csv", "index": i}
+                for i in range(len(store))]
+    with open(str(tmp_path / "metadata.json"), "w") as f:
+        json.dump(metadata, f)
+    return store
+
+def test_dedup_drops_exact_and_near_duplicates(tmp_path):
+    _write_store(tmp_path)
+    report = dedup_windows.main(data_dir=str(tmp_path), workers=2, shard_size=16)
+    assert report['total'] == 50
+    assert report['dropped_exact'] == 5
+    assert report['dropped_near'] == 5
+    assert report['per_source']['dev_a_reupload.csv'] == {'total': 10, 'kept': 0, 'exact': 5, 'near': 5}
+    assert report['per_source']['dev_a.csv']['kept'] == 40
+    keep_idx = np.load(str(tmp_path / "windows_dedup_index.npy"))
+    assert keep_idx.tolist() == list(range(40))
+
+def test_sharded_signatures_match_single_process(tmp_path):
+    _write_store(tmp_path)
+    path = str(tmp_path / "windows.npy")
+    h1, s1, n1 = dedup_windows.compute_signatures(path, workers=1, shard_size=1000)
+    h2, s2, n2 = dedup_windows.compute_signatures(path, workers=2, shard_size=7)
+    assert h1 == h2
+    assert np.array_equal(s1, s2)
+    assert np.allclose(n1, n2)
+
+def test_sharded_verification_matches_single_process(tmp_path):
+    _write_store(tmp_path)
+    path = str(tmp_path / "windows.npy")
+    single = dedup_windows.find_duplicates(path, workers=1, shard_size=1000)
+    sharded = dedup_windows.find_duplicates(path, workers=2, shard_size=6, max_bucket=3)
+    assert np.array_equal(single[0], sharded[0])
+    assert single[1] == sharded[1] and single[2] == sharded[2]
@@ -0,0 +1,55 @@
+import numpy as np
+import tensorflow as tf
+from src.model.tcn import build_tcn, build_tiny_tcn
+from src.model.export_tflite import export_model_to_tflite
+from src.model.tflite_profile import profile_tflite, check_budget
+from src.model.tflite_runner import TFLiteClassifier
+from src.train.distill import distill, fit_to_input, main, soften, synthetic_windows
+
+def test_tiny_tcn_is_much_smaller_and_has_no_hidden_dense():
+    teacher = build_tcn(input_shape=(100, 10))
+    student = build_tiny_tcn(input_shape=(100, 10))
+    assert student.count_params() * 10 < teacher.count_params()
+    dense = [layer for layer in student.layers if isinstance(layer, tf.keras.layers.Dense)]
+    assert [layer.name for layer in dense] == ['logits']
+
+def test_soften_keeps_argmax_and_flattens():
+    probs = np.array([[0.9, 0.08, 0.02]], dtype='float32')
+    soft = soften(probs, 4.0)
+    np.testing.assert_allclose(soft.sum(axis=1), 1.0, rtol=1e-6)
+    assert soft.argmax() == 0 and soft.max() < 0.9
+
+def test_distill_export_int8_and_profile(tmp_path):
+    tf.keras.utils.set_random_seed(0)
+    X, y = synthetic_windows(n_per_class=20, seq_len=40)
+    teacher = build_tcn(input_shape=X.shape[1:], num_classes=3)
+    teacher.compile(optimizer='adam', loss='sparse_categorical_crossentropy')
+    teacher.fit(X, y, epochs=1, verbose=0)
+    student, history = distill(teacher, X[::2], y[::2], X[1::2], y[1::2], epochs=2, num_filters=8, num_blocks=3)
+    assert len(history['loss']) == 2
+    path = export_model_to_tflite(student, str(tmp_path / 'student.tflite'), int8_io=True,
+                                  representative_data=lambda: ([X[i:i + 1]] for i in range(20)))
+    clf = TFLiteClassifier(path)
+    assert clf.input_details['dtype'] == np.int8
+    assert clf.predict(X[0]).shape == (3,)
+    report = profile_tflite(path, runs=5)
+    assert {'CONV_2D', 'DEPTHWISE_CONV_2D', 'FULLY_CONNECTED'} <= {r['op'] for r in report['ops']}
+    assert 0 < report['arena_bytes'] < 8 * 1024
+    assert abs(sum(r['latency_ms_est'] for r in report['ops']) - report['latency_ms']) < 1e-6
+    assert check_budget(report, arena_kb=1024, flash_kb=1024) == []
+    assert check_budget(report, arena_kb=0.001)
+
+def test_fit_to_input_pads_and_truncates_channels():
+    X = np.ones((2, 100, 9), dtype='float32')
+    padded = fit_to_input(X, (None, 100, 10))
+    assert padded.shape == (2, 100, 10) and padded[..., 9].max() == 0 and padded[..., :9].min() == 1
+    assert fit_to_input(X, (None, 100, 7)).shape == (2, 100, 7)
+
+def test_main_distills_from_default_build_tcn_teacher(tmp_path):
+    teacher_path = str(tmp_path / 'teacher.keras')
+    build_tcn().save(teacher_path)
+    report = main(data_dir=str(tmp_path / 'no_store'), teacher_path=teacher_path, out_dir=str(tmp_path / 'student'),
+                  epochs=1, rep_samples=20, profile_runs=5, arena_kb=1024, flash_kb=1024, latency_ms=1000)
+    assert report['violations'] == []
+    assert (tmp_path / 'student' / 'student_int8.tflite').exists()
+    assert TFLiteClassifier(str(tmp_path / 'student' / 'student_int8.tflite')).input_shape == (1, 100, 10)
@@ -0,0 +1,48 @@
+import numpy as np
+from src.analytics.hotspots import HotspotIndex, geohash_encode, geohash_to_str, geohash_from_str
+
+SE = (-23.5505, -46.6333)     # Praça da Sé
+PAULISTA = (-23.5614, -46.6559)
+
+def test_geohash_matches_reference_encoding():
+    assert geohash_to_str(geohash_encode(57.64911, 10.40744, 11)[0], 11) == 'u4pruydqqvj'
+    assert geohash_from_str('u4pruyd') == int(geohash_encode(57.64911, 10.40744, 7)[0])
+
+def test_top_k_by_mugging_rate_in_last_hour():
+    index = HotspotIndex(device_locations={'se': SE, 'paulista': PAULISTA}, bin_seconds=60)
+    now = 10 * 3600.0
+    # an hour ago Paulista was bad, but in the last hour Sé has the higher mugging rate
+    index.add_batch([now - 7000] * 10, ['mugging'] * 10, [0.9] * 10, devices=['paulista'] * 10)
+    index.add_batch(np.full(10, now - 100), ['walk'] * 8 + ['mugging'] * 2, [0.9] * 10, devices=['paulista'] * 10)
+    index.add_batch(np.full(4, now - 50), ['walk', 'mugging', 'mugging', 'drive'], [0.9] * 4, devices=['se'] * 4)
+    index.add('unknown-device', now, 'mugging', 0.9)
+    top = index.top_k('mugging', k=2, window_seconds=3600)
+    assert [t['cell'] for t in top] == [geohash_to_str(geohash_encode(*SE)[0]), geohash_to_str(geohash_encode(*PAULISTA)[0])]
+    assert top[0]['rate'] == 0.5 and top[0]['total'] == 4
+    assert top[1]['count'] == 2 and top[1]['total'] == 10
+    assert index.skipped == 1
+
+def test_mixed_registry_and_explicit_coordinates_are_located_per_event():
+    index = HotspotIndex(device_locations={'se': SE}, bin_seconds=60)
+    index.add('se', 100.0, 'mugging', 0.9)
+    index.add('mobile-1', 110.0, 'mugging', 0.9, lat=PAULISTA[0], lon=PAULISTA[1])
+    index.flush()
+    assert (index.ingested, index.skipped) == (2, 0)
+    index.add_batch([120.0, 130.0, 140.0], ['walk'] * 3, [0.9] * 3, devices=['se', 'mobile-2', 'mobile-3'],
+                    lat=[np.nan, PAULISTA[0], np.nan], lon=[np.nan, PAULISTA[1], np.nan])
+    assert (index.ingested, index.skipped) == (4, 1)
+    totals = {t['cell']: t['total'] for t in index.top_k('walk', k=5, window_seconds=3600)}
+    assert totals == {geohash_to_str(geohash_encode(*SE)[0]): 2, geohash_to_str(geohash_encode(*PAULISTA)[0]): 2}
+
+def test_rolling_rate_and_compaction_bound_memory():
+    index = HotspotIndex(device_locations={'se': SE}, bin_seconds=60, retention_seconds=600, compact_every_seconds=60)
+    for minute in range(60):
+        ev = ['mugging' if minute % 2 else 'walk'] * 5
+        index.add_batch(np.full(5, minute * 60.0 + 1), ev, np.ones(5), vectors=np.ones((5, 2)), devices=['se'] * 5)
+    # only the retention window (10 fine bins) stays in memory; older bins are folded into the archive
+    assert len(index) <= 11
+    assert index.archive.counts[:index.archive.size].sum() + index.recent.counts[:index.recent.size].sum() == 300
+    cell = geohash_to_str(geohash_encode(*SE)[0])
+    times, rates, counts = index.rolling_rate(cell, 'mugging', window_seconds=120)
+    assert len(times) == 10
+    assert np.allclose(rates[1:], 0.5)
@@ -0,0 +1,77 @@
+import os
+import time
+import threading
+import numpy as np
+import tensorflow as tf
+from src.model.export_tflite import export_model_to_tflite
+from src.model.interpreter_pool import InterpreterPool
+
+def _export_tiny(path, seed, age=10):
+    tf.keras.utils.set_random_seed(seed)
+    model = tf.keras.Sequential([tf.keras.layers.Input(shape=(20, 3)),
+                                 tf.keras.layers.Conv1D(4, 3, padding='causal', activation='relu'),
+                                 tf.keras.layers.GlobalAveragePooling1D(),
+                                 tf.keras.layers.Dense(3, activation='softmax')])
+    export_model_to_tflite(model, path)
+    # backdate so the pool's settle guard treats the file as complete
+    old = time.time() - age
+    os.utime(path, (old, old))
+    return path
+
+def test_pool_hot_swaps_without_failing_inflight_requests(tmp_path):
+    model_dir = tmp_path / "models"
+    model_dir.mkdir()
+    _export_tiny(str(model_dir / "v1.tflite"), seed=1, age=20)
+    window = np.random.randn(20, 3).astype('float32')
+    pool = InterpreterPool(str(model_dir), workers=2, warmup_samples=2, warmup_folder=str(tmp_path / "none"))
+    pool.start(watch=False)
+    try:
+        v1 = pool.version
+        before = pool.predict(window)
+        assert before.shape == (3,)
+        errors = []
+
+        def hammer():
+            try:
+                pool.predict_many([window] * 50)
+            except Exception as e:
+                errors.append(e)
+        t = threading.Thread(target=hammer)
+        t.start()
+        _export_tiny(str(model_dir / "v2.tflite"), seed=2, age=10)
+        assert pool.check_for_update()
+        t.join()
+        assert not errors
+        assert pool.version != v1 and pool.version.startswith("v2.tflite")
+        assert not np.allclose(pool.predict(window), before)
+        assert not pool.check_for_update()
+    finally:
+        pool.stop()
+
+def test_shadow_model_is_compared(tmp_path):
+    primary = _export_tiny(str(tmp_path / "primary.tflite"), seed=1)
+    shadow = _export_tiny(str(tmp_path / "shadow.tflite"), seed=1)
+    pool = InterpreterPool(primary, workers=1, warmup_samples=1, warmup_folder=str(tmp_path / "none"))
+    pool.start(watch=False)
+    try:
+        pool.set_shadow(shadow)
+        pool.predict_many([np.random.randn(20, 3).astype('float32') for _ in range(10)])
+    finally:
+        pool.stop()
+    report = pool.shadow_report()
+    assert report['compared'] == 10
+    assert report['agreement'] == 1.0
+    assert report['max_abs_diff'] < 1e-5
+
+def test_shadow_requests_over_the_cap_are_skipped(tmp_path):
+    primary = _export_tiny(str(tmp_path / "primary.tflite"), seed=1)
+    pool = InterpreterPool(primary, workers=1, warmup_samples=1, warmup_folder=str(tmp_path / "none"), shadow_max_pending=0)
+    pool.start(watch=False)
+    try:
+        pool.set_shadow(primary)
+        pool.predict_many([np.random.randn(20, 3).astype('float32') for _ in range(5)])
+    finally:
+        pool.stop()
+    report = pool.shadow_report()
+    assert report['skipped'] == 5 and report['compared'] == 0
+    assert pool._shadow_pending == 0
@@ -0,0 +1,147 @@
+import json
+import time
+import socket
+import asyncio
+import numpy as np
+from fake_mqtt_broker import FakeBroker
+from src.ingest.mqtt_ingest import MQTTIngestClient, DropOldestQueue, _AsyncioHelper
+
+def _frame(device, i):
+    return json.dumps({'ts': float(i), 'frame': np.random.randn(10).tolist()}).encode()
+
+async def _wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        await asyncio.sleep(0.01)
+
+def test_drop_oldest_queue_evicts_per_device_and_round_robins():
+    async def run():
+        q = DropOldestQueue(maxsize=10, max_per_device=2)
+        assert q.put_nowait('a', 1) is None
+        q.put_nowait('a', 2)
+        assert q.put_nowait('a', 3) == 1
+        q.put_nowait('b', 10)
+        got = [await q.get() for _ in range(3)]
+        assert got == [('a', 2), ('b', 10), ('a', 3)]
+        assert q.qsize() == 0 and q.dropped == 1
+    asyncio.run(run())
+
+def test_ingest_windows_per_device_and_runs_inference():
+    results = []
+
+    async def run():
+        async with FakeBroker() as broker:
+            client = MQTTIngestClient(lambda w: np.array([w.shape[0], w.shape[1]], dtype='float32'), broker='127.0.0.1',
+                                      port=broker.port, seq_len=20, stride=10, on_result=lambda d, ts, p: results.append((d, ts, p)))
+            await client.start()
+            for i in range(40):
+                for device in ('dev1', 'dev2'):
+                    await broker.publish(f'citysafesense/sensor/{device}', _frame(device, i))
+            await broker.publish('citysafesense/sensor/dev1', b'not json')
+            await _wait_for(lambda: len(results) == 6)
+            stats = client.stats()
+            await client.stop()
+            return stats
+
+    stats = asyncio.run(run())
+    assert sorted(d for d, _, _ in results) == ['dev1'] * 3 + ['dev2'] * 3
+    assert all(np.array_equal(p, [20, 10]) for _, _, p in results)
+    assert sorted(ts for d, ts, _ in results if d == 'dev1') == [19.0, 29.0, 39.0]
+    assert stats['decode_errors'] == 1 and stats['window_dropped'] == 0
+
+def test_overload_drops_oldest_windows_without_stalling_loop():
+    async def run():
+        async with FakeBroker() as broker:
+            def slow_predict(w):
+                time.sleep(0.05)
+                return np.zeros(3, dtype='float32')
+            client = MQTTIngestClient(slow_predict, broker='127.0.0.1', port=broker.port, seq_len=5, stride=1,
+                                      max_windows_per_device=2, inference_workers=1)
+            await client.start()
+            lag = 0.0
+            for i in range(200):
+                tick = time.perf_counter()
+                await broker.publish('citysafesense/sensor/dev1', _frame('dev1', i))
+                await asyncio.sleep(0)
+                lag = max(lag, time.perf_counter() - tick)
+            await _wait_for(lambda: client.stats()['windows'] == 196)
+            stats = client.stats()
+            await client.stop()
+            return stats, lag
+
+    stats, lag = asyncio.run(run())
+    assert stats['window_dropped'] > 150
+    assert stats['window_depth'] <= 2
+    # inference sleeps in a worker thread; the event loop keeps turning
+    assert lag < 0.1
+
+def test_window_cadence_follows_stride_beyond_seq_len():
+    client = MQTTIngestClient(None, seq_len=5, stride=10)
+    emitted = [i for i in range(40) if client._window('dev1', float(i), np.zeros(3, dtype='float32')) is not None]
+    assert emitted == [4, 14, 24, 34]
+    client = MQTTIngestClient(None, seq_len=5, stride=2)
+    emitted = [i for i in range(10) if client._window('dev1', float(i), np.zeros(3, dtype='float32')) is not None]
+    assert emitted == [4, 6, 8]
+
+def test_device_buffers_are_evicted_by_lru_and_idle_time():
+    client = MQTTIngestClient(None, seq_len=5, stride=5, max_devices=3)
+    frame = np.zeros(3, dtype='float32')
+    for dev in ('a', 'b', 'c', 'a', 'd'):
+        client._window(dev, 0.0, frame)
+    # 'b' was the least recently seen when 'd' arrived
+    assert list(client._buffers) == ['c', 'a', 'd']
+    client._buffers['c'].last_seen -= 1000
+    client._buffers['a'].last_seen -= 1000
+    client._window('d', 1.0, frame)
+    assert list(client._buffers) == ['d']
+    assert client._counts['buffers_evicted'] == 3
+
+def test_reconnects_after_broker_drops_connection():
+    results = []
+
+    async def run():
+        async with FakeBroker() as broker:
+            client = MQTTIngestClient(lambda w: np.zeros(3, dtype='float32'), broker='127.0.0.1', port=broker.port,
+                                      seq_len=5, stride=5, reconnect_min_delay=0.05,
+                                      on_result=lambda d, ts, p: results.append(ts))
+            await client.start()
+            for i in range(10):
+                await broker.publish('citysafesense/sensor/dev1', _frame('dev1', i))
+            await _wait_for(lambda: len(results) == 2)
+            broker.drop_clients()
+            await _wait_for(lambda: client.stats()['reconnects'] == 1 and broker.subscriptions)
+            for i in range(10, 20):
+                await broker.publish('citysafesense/sensor/dev1', _frame('dev1', i))
+            await _wait_for(lambda: len(results) == 4)
+            stats = client.stats()
+            await client.stop()
+            return stats, broker.connections
+
+    stats, connections = asyncio.run(run())
+    assert results == [4.0, 9.0, 14.0, 19.0]
+    assert stats['disconnects'] == 1 and connections == 2
+
+def test_paused_reads_are_resumed_after_max_pause():
+    class StubClient:
+        def loop_read(self):
+            pass
+
+        def loop_misc(self):
+            return 0
+
+    async def run():
+        a, b = socket.socketpair()
+        helper = _AsyncioHelper(asyncio.get_running_loop(), StubClient(), max_pause=0.1, drain_seconds=0.5, tick=0.02)
+        helper.on_socket_open(None, None, a)
+        helper.pause_reading()
+        assert helper.paused
+        await _wait_for(lambda: not helper.paused, timeout=1.0)
+        # within the drain window a full queue does not pause the socket again
+        helper.pause_reading()
+        assert not helper.paused and helper.forced_reads == 1
+        helper.on_socket_close(None, None, a)
+        a.close()
+        b.close()
+    asyncio.run(run())
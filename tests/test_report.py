@@ -0,0 +1,35 @@
+import json
+import numpy as np
+from src.visualize.report import minmax_decimate, generate_reports, _PageRenderer
+
+def test_minmax_decimate_keeps_extremes():
+    y = np.random.randn(100000)
+    y[12345] = 50.0
+    y[54321] = -50.0
+    x, yd = minmax_decimate(y, max_points=1000)
+    assert len(yd) <= 1000
+    assert yd.max() == 50.0 and yd.min() == -50.0
+    assert np.all(np.diff(x) >= 0)
+    assert np.array_equal(yd, y[x])
+
+def test_generate_reports_per_group_in_parallel(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    np.save(str(data_dir / "windows.npy"), np.random.randn(20, 100, 7).astype('float32'))
+    meta = [{"file": f"w{i}.npy", "source": f"/raw/hotspot_{'a' if i < 14 else 'b'}.csv", "index": i} for i in range(20)]
+    with open(str(data_dir / "metadata.json"), "w") as f:
+        json.dump(meta, f)
+    results = generate_reports(data_dir=str(data_dir), out_dir=str(tmp_path / "reports"), workers=2, pages_per_file=1, rows=2, cols=2)
+    pages = {r[0].split('/')[-1]: r[1] for r in results}
+    # hotspot_a: 14 windows at 4 per page, 1 page per file -> 4 parts
+    assert pages == {'hotspot_a_part001.pdf': 1, 'hotspot_a_part002.pdf': 1, 'hotspot_a_part003.pdf': 1,
+                     'hotspot_a_part004.pdf': 1, 'hotspot_b_part001.pdf': 1, 'hotspot_b_part002.pdf': 1}
+    for path, _ in results:
+        assert open(path, 'rb').read(5) == b'%PDF-'
+
+def test_page_renderer_shows_every_channel():
+    renderer = _PageRenderer(rows=1, cols=2)
+    windows = [np.random.randn(100, 9).astype('float32'), np.random.randn(100, 7).astype('float32')]
+    renderer.draw(windows, ['nine', 'seven'], 'page', max_points=2000)
+    assert [sum(line.get_visible() and len(line.get_xdata()) == 100 for line in lines) for lines in renderer.lines] == [9, 7]
+    assert len(renderer.axes[0].get_legend().get_texts()) == 9
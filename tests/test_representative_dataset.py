@@ -0,0 +1,64 @@
+import json
+import numpy as np
+import pandas as pd
+from src.tools import csv_to_windows
+from src.tools import representative_dataset as rd
+
+def _write_csv(path, n):
+    pd.DataFrame(np.random.randn(n, 4), columns=['ax','ay','az','speed']).to_csv(path, index=False)
+
+def _build_store(tmp_path):
+    input_dir = tmp_path / "raw_csvs"
+    input_dir.mkdir()
+    _write_csv(str(input_dir / "walk_a.csv"), 2000)
+    _write_csv(str(input_dir / "walk_b.csv"), 2000)
+    _write_csv(str(input_dir / "mug_a.csv"), 150)
+    out_dir = tmp_path / "data"
+    labels = {'walk_a': 'walk', 'walk_b': 'walk', 'mug_a': 'mugging'}
+    csv_to_windows.main(input_dir=str(input_dir), out_dir=str(out_dir), seq_len=100, stride=50, labels=labels)
+    return out_dir
+
+def test_allocate_is_even_and_capped():
+    assert rd._allocate(10, [100, 100]) == [5, 5]
+    assert rd._allocate(10, [2, 100]) == [2, 8]
+    assert rd._allocate(5, [1, 1]) == [3, 2]
+
+def test_store_sampling_is_stratified_and_reproducible(tmp_path):
+    out_dir = _build_store(tmp_path)
+    store = np.load(str(out_dir / "windows.npy"))
+    assert store.ndim == 3 and store.shape[1:] == (100, 4)
+    folder = str(out_dir / "rep_windows")
+    samples = [s[0] for s in rd.representative_generator(num_samples=40, folder=folder, seed=7)]
+    again = [s[0] for s in rd.representative_generator(num_samples=40, folder=folder, seed=7)]
+    assert len(samples) == 40
+    assert all(np.array_equal(a, b) for a, b in zip(samples, again))
+    # the 2 mugging windows are always included even though they are <3% of the store
+    meta = json.load(open(str(out_dir / "metadata.json")))
+    mug_rows = [m['index'] for m in meta if m.get('label') == 'mugging']
+    found = {i for i in mug_rows for s in samples if np.array_equal(s[0], store[i])}
+    assert found == set(mug_rows)
+    # windows are yielded exactly as stored (no re-standardization)
+    assert any(np.array_equal(samples[0][0], store[i]) for i in range(store.shape[0]))
+
+def test_folder_fallback_to_sample_when_folder_missing(tmp_path):
+    sample = tmp_path / "sample.npy"
+    np.save(str(sample), (np.random.randn(500, 10) * 5 + 3).astype('float32'))
+    out = list(rd.representative_generator(num_samples=8, sample_path=str(sample), folder=str(tmp_path / "missing"), seed=0))
+    assert len(out) == 8
+    win = out[0][0][0]
+    assert win.shape == (100, 10)
+    assert np.allclose(win.mean(axis=0), 0, atol=1e-4)
+
+def test_stale_store_is_not_sampled(tmp_path):
+    out_dir = _build_store(tmp_path)
+    stale = np.load(str(out_dir / "windows.npy"))
+    # a rerun whose windows cannot be stacked (differing channel counts) must not leave the old store behind
+    input_dir = tmp_path / "raw_mixed"
+    input_dir.mkdir()
+    _write_csv(str(input_dir / "a.csv"), 300)
+    pd.DataFrame(np.random.randn(300, 3), columns=['ax', 'ay', 'az']).to_csv(str(input_dir / "b.csv"), index=False)
+    csv_to_windows.main(input_dir=str(input_dir), out_dir=str(out_dir), seq_len=100, stride=50)
+    assert not (out_dir / "windows.npy").exists()
+    # and a store that the metadata indices do not cover exactly is ignored
+    np.save(str(out_dir / "windows.npy"), stale)
+    assert rd.representative_generator_from_store(str(out_dir / "windows.npy"), str(out_dir / "metadata.json")) is None